@@ -43,3 +43,11 @@ class CliqueConfiguration:
 
     def getAllValues(self):
         return self.value
+
+    # Set the objective values for all the combinations of the separator at once. values[x_s] is the value of the combination x_s
+    def setAllValues(self, values):
+        self.value = values
+
+    # Set the residue choices for all the combinations of the separator at once. variables[x_s] is the choice for the combination x_s
+    def setAllVariables(self, variables):
+        self.variables = variables
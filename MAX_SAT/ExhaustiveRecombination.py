@@ -39,14 +39,8 @@ def createAllOffsprings(p, diffVars, partial_sols):
 def getObjectiveValue(p, diffVars, choices):
     off = createAnOffspring(p, diffVars, choices) # create the offspring by add
 
-    inst = instance.instance
-    sfs = inst.getSubFunctions()
-    obj = 0
-    for s in range(len(sfs)):
-        sf = sfs[s]
-        t = tuple([off[i] for i in sf])
-        obj += inst.evaluate(s, t)
-    return abs(obj)
+    # all the clauses are evaluated at once (see MAXSAT.evaluatePopulation)
+    return instance.instance.evaluateSolution(off)
 
 
 # Identifies variables with different values in both parents. The exhaustive search will be made in these variables.
@@ -0,0 +1,114 @@
+"""
+Island model: several populations (islands), each one evolved by a GeneticAlgorithm in its own process, that exchange their best individuals.
+The instance is stored once in shared memory (see parallel_recombination.SharedArrays), and each island creates its own instance from it (with fromArrays).
+Every 'migration_interval' generations, each island sends its 'migrants' best individuals to the next island (in a ring) through a queue.
+The migration is asynchronous: the migrants are sent without waiting for the receiving island, and each island only takes the migrants already in its queue, so a slow island does not block the others.
+The migrants replace the worst individuals of the receiving island (see GeneticAlgorithm.insert).
+Each island reports its throughput (recombinations and evaluations per second) and the latency of the migrations it received (the time between sending and inserting the migrants).
+"""
+
+import multiprocessing as mp
+import queue
+import time
+import numpy as np
+from GeneticAlgorithm import GeneticAlgorithm
+from parallel_recombination import SharedArrays
+
+__all__ = ["run_islands"]
+
+
+def _island(island_id, instance_class, instance_spec, ga_kwargs, generations, migration_interval, migrants, inbox, outbox, results):
+    shared_instance = SharedArrays(spec=instance_spec)
+    inst = instance_class.fromArrays(shared_instance.arrays)
+    ga = GeneticAlgorithm(inst, **ga_kwargs)
+    ga.initialize()
+
+    sent, received, latencies = 0, 0, []
+    start = time.perf_counter()
+    for generation in range(1, generations+1):
+        ga.step()
+
+        if generation % migration_interval == 0:
+            X, fitness = ga.best(migrants)
+            outbox.put((island_id, time.time(), X, fitness)) # does not wait for the other island
+            sent += 1
+
+        # take the migrants already received, without waiting for them
+        while True:
+            try:
+                _, sent_time, X, fitness = inbox.get_nowait()
+            except queue.Empty:
+                break
+            ga.insert(X, fitness)
+            latencies.append(time.time() - sent_time)
+            received += 1
+    elapsed = time.perf_counter() - start
+
+    recombinations = sum(s["recombinations"] for s in ga.history)
+    recombination_time = sum(s["recombination_time"] for s in ga.history)
+    evaluation_time = sum(s["evaluation_time"] for s in ga.history)
+    best, best_fitness = ga.best()
+    results.put({
+        "island": island_id,
+        "best": best[0],
+        "fitness": float(best_fitness[0]),
+        "generations": generations,
+        "time": elapsed,
+        "recombinations": recombinations,
+        "recombinations/s": recombinations/recombination_time if recombination_time > 0 else 0.0,
+        "evaluations": ga.evaluations,
+        "evaluations/s": ga.evaluations/evaluation_time if evaluation_time > 0 else 0.0,
+        "migrations_sent": sent,
+        "migrations_received": received,
+        "mean_latency": float(np.mean(latencies)) if len(latencies) > 0 else None,
+        "max_latency": float(np.max(latencies)) if len(latencies) > 0 else None,
+    })
+
+    # the migrants that were not received by the next island (e.g., because it already finished) are discarded, instead of blocking the end of this process
+    outbox.cancel_join_thread()
+    shared_instance.close()
+
+"""
+Run 'n_islands' islands, each one for 'generations' generations, and return the best individual found, its fitness and the report of each island (a list of dictionaries, see _island).
+'ga_kwargs' are the arguments of the GeneticAlgorithm of each island (they must be picklable, e.g., no 'recombiner'). The seed of island i is seed+i, if a seed is given.
+'start_method' is the start method of the processes (by default, the default of multiprocessing).
+"""
+def run_islands(inst, n_islands=None, generations=100, migration_interval=10, migrants=1, ga_kwargs=None, seed=None, start_method=None):
+    n_islands = mp.cpu_count() if n_islands is None else n_islands
+    ga_kwargs = {} if ga_kwargs is None else ga_kwargs
+    ctx = mp.get_context(start_method)
+
+    shared_instance = SharedArrays(inst.toArrays())
+    try:
+        inboxes = [ctx.Queue() for _ in range(n_islands)]
+        results = ctx.Queue()
+        islands = []
+        for i in range(n_islands):
+            kwargs = dict(ga_kwargs)
+            if seed is not None:
+                kwargs["seed"] = seed + i
+            args = (i, type(inst), shared_instance.spec, kwargs, generations, migration_interval, migrants, inboxes[i], inboxes[(i+1) % n_islands], results)
+            islands.append(ctx.Process(target=_island, args=args))
+
+        for p in islands:
+            p.start()
+
+        # the results are read before joining the processes, so that no process waits for its results to be read
+        reports = []
+        while len(reports) < n_islands:
+            try:
+                reports.append(results.get(timeout=1))
+            except queue.Empty:
+                if any(p.exitcode not in (None, 0) for p in islands):
+                    for p in islands:
+                        p.terminate()
+                    raise RuntimeError("An island ended with an error")
+        reports.sort(key=lambda r: r["island"])
+
+        for p in islands:
+            p.join()
+    finally:
+        shared_instance.unlink()
+
+    best = max(reports, key=lambda r: r["fitness"])
+    return best["best"], best["fitness"], reports
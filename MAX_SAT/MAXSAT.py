@@ -1,43 +1,207 @@
 """
 Constructs an MaxSAT instance according with the format for complete weighted instances in: https://maxsat-evaluations.github.io
+The hard clauses are sub-functions with the weight of the hard clauses (top), as the other clauses.
 """
 
 
 import numpy as np
-import random as rnd
-from collections import defaultdict
 from SubFunction import *
+from wcnf_parser import readWCNF
+from instance_cache import saveArrays, loadArrays, cachedArrays
 
+"""
+Read-only sequence with the tuple of variables of each clause (sub-function), as returned by MAXSAT.getSubFunctions.
+The tuple of clause i is created from the CSR arrays of the instance when first requested, and cached.
+"""
+class ClauseTuples:
+
+    def __init__(self, clause_ptr, clause_vars):
+        self.clause_ptr = clause_ptr
+        self.clause_vars = clause_vars
+        self.cache = {}
+
+    def __len__(self):
+        return len(self.clause_ptr)-1
+
+    def __getitem__(self, i):
+        t = self.cache.get(i)
+        if t is None:
+            if i < 0:
+                i += len(self)
+            if i < 0 or i >= len(self):
+                raise IndexError("clause index out of range")
+            t = tuple(self.clause_vars[self.clause_ptr[i]:self.clause_ptr[i+1]].tolist())
+            self.cache[i] = t
+        return t
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+"""
+The clauses are stored in CSR (columnar) arrays, instead of one object per clause:
+    - self.clausePtr: the literals of clause i are in the positions self.clausePtr[i] to self.clausePtr[i+1]-1 of the following arrays
+    - self.clauseVars: the variable (starting at 0) of each literal
+    - self.clauseSigns: 1 if the literal is positive and 0 if it is negated, i.e., the value of the variable that satisfies the literal
+    - self.weights: the weight (int64) of each clause
+"""
 class MAXSAT:
 
+    # 'inst_file' may be in the format up to 2021 or from 2022, and may be compressed (see wcnf_parser.py)
     def __init__(self, inst_file):
 
-        self.sub_functions = []
-        with open(inst_file, "r") as f:
-            line = f.readline().split()
-            while(line[0] != "p"):
+        arrays = readWCNF(inst_file)
+        self.nvar, self.nclauses = arrays["nvar"], arrays["nclauses"]
+        self.clausePtr = arrays["clause_ptr"]
+        self.clauseVars = arrays["clause_vars"]
+        self.clauseSigns = arrays["clause_signs"]
+        self.weights = arrays["weights"]
+        self.hard = arrays["hard"] # the hard clauses, which have weight self.top
+        self.top = arrays["top"]
+        self.createViews()
+
+    # create the tuples of the clauses (see ClauseTuples) and the index of the clauses of each variable
+    def createViews(self):
+        self.sub_function_tuples = ClauseTuples(self.clausePtr, self.clauseVars)
+        self.createFalseMasks()
+        self.createIncidenceIndex()
+
+    # Create the array self.falseMasks with the falsifying mask of each clause (see getFalseMask), computed for all the clauses at once.
+    # The mask of a clause with more than MAX_PACKED_BITS literals does not fit in the array, and it is computed by getFalseMask when needed
+    def createFalseMasks(self):
+        lens = np.diff(self.clausePtr)
+        clause_ids = np.repeat(np.arange(len(lens), dtype=np.int64), lens)
+        shifts = self.clausePtr[1:][clause_ids] - 1 - np.arange(len(self.clauseVars), dtype=np.int64) # position of each literal from the end of its clause
+        bits = (1 - self.clauseSigns.astype(np.int64)) << np.minimum(shifts, MAX_PACKED_BITS-1)
+
+        self.falseMasks = np.zeros(len(lens), dtype=np.int64)
+        nonempty = np.flatnonzero(lens > 0)
+        if len(nonempty) > 0:
+            self.falseMasks[nonempty] = np.add.reduceat(bits, self.clausePtr[nonempty]) # the bits of different literals do not overlap
 
-                line = f.readline().split()
-            # reads the number of variables and clauses (sub-functions)
-            self.nvar, self.nclauses = int(line[2]), int(line[3])
+    # Create an index, in CSR format, of the sub-functions where each variable appears.
+    # The sub-functions of variable v are self.incidenceIdx[self.incidencePtr[v]:self.incidencePtr[v+1]]
+    def createIncidenceIndex(self):
+        sf_vars = self.clauseVars
+        sf_ids = np.repeat(np.arange(len(self.weights), dtype=np.int64), np.diff(self.clausePtr))
+        n_vars = max(self.nvar, int(sf_vars.max())+1 if len(sf_vars) > 0 else 0)
 
-            # constructs the sub-functions by reading each clause in the instance file
-            # Each sub-function is an instance of the classe SubFunction
-            line = f.readline().split()
-            while(len(line) > 0):
-                w = int(line[0])
-                vars = [int(line[i]) for i in range(1, len(line)-1)] # exclude the first value (of the weight) and the last one (the 'stop sign' 0)
-                self.sub_functions.append(SubFunction(w, vars))
-                line = f.readline().split()
+        self.incidenceIdx = sf_ids[np.argsort(sf_vars, kind="stable")]
+        self.incidencePtr = np.zeros(n_vars+1, dtype=np.int64)
+        np.cumsum(np.bincount(sf_vars, minlength=n_vars), out=self.incidencePtr[1:])
+
+    # get the indices (sorted, without repetitions) of the sub-functions where at least one of the given variables appears
+    def getIncidentSubFunctions(self, variables):
+        variables = np.asarray(variables, dtype=np.int64)
+        starts = self.incidencePtr[variables]
+        lens = self.incidencePtr[variables+1] - starts
+
+        # positions, in self.incidenceIdx, of the sub-functions of all the variables
+        positions = np.repeat(starts - np.cumsum(lens) + lens, lens) + np.arange(lens.sum())
+        return np.unique(self.incidenceIdx[positions])
 
     def getSubFunctions(self):
-        return [s.getTuple() for s in self.sub_functions]
+        return self.sub_function_tuples
+
+    # the clause i as an instance of the class SubFunction
+    def getSubFunction(self, i):
+        start, end = self.clausePtr[i], self.clausePtr[i+1]
+        literals = np.where(self.clauseSigns[start:end] == 1, 1, -1)*(self.clauseVars[start:end]+1)
+        return SubFunction(int(self.weights[i]), literals.tolist())
+
+    # The only assignment of the variables of clause i that falsifies it, packed in an integer (see SubFunction.packAssignment), i.e., with 1 in the negated variables
+    def getFalseMask(self, i):
+        start, end = self.clausePtr[i], self.clausePtr[i+1]
+        if end - start <= MAX_PACKED_BITS:
+            return int(self.falseMasks[i])
+        return packAssignment((1 - self.clauseSigns[start:end].astype(np.int64)).tolist())
 
+    # evaluate the clause i, given the values of its variables in the tuple t (in the same order as in getSubFunctions()[i])
+    # t is packed in an integer, and the clause is satisfied iff it is not its falsifying mask
     def evaluate(self, i, t):
-        return self.sub_functions[i].evaluate(t)
+        return int(self.weights[i]) if packAssignment(t) != self.getFalseMask(i) else 0
+
+    # objective value of the solution x (an array with the value of each variable), i.e., the sum of the weights of the satisfied clauses
+    def evaluateSolution(self, x):
+        return int(self.evaluatePopulation(np.asarray(x)[None])[0])
+
+    """
+    Objective values of all the solutions in the rows of the 2d 0/1 array X (a population, with shape (B, n)).
+    The literals of the clauses are evaluated for all the solutions at once, with the CSR arrays, and the literals of each clause are reduced with np.logical_or.reduceat.
+    The clauses are evaluated in blocks, so that the (B, literals) array of each block has at most about 'block_size' elements (a clause with more literals is a block by itself).
+    """
+    def evaluatePopulation(self, X, block_size=1 << 24):
+        X = np.asarray(X)
+        values = np.zeros(len(X), dtype=np.int64)
+        if len(X) == 0:
+            return values
+
+        literals_per_block = max(1, block_size // len(X))
+        first = 0
+        while first < len(self.weights):
+            # the clauses first..last-1, with at most literals_per_block literals (or a single clause)
+            last = int(np.searchsorted(self.clausePtr, self.clausePtr[first] + literals_per_block, side="right")) - 1
+            last = min(max(last, first+1), len(self.weights))
+
+            start, end = self.clausePtr[first], self.clausePtr[last]
+            clauses = np.arange(first, last)
+            clauses = clauses[self.clausePtr[clauses+1] > self.clausePtr[clauses]] # the empty clauses are never satisfied (and reduceat does not reduce empty ranges)
+            if len(clauses) > 0:
+                satisfied = X[:, self.clauseVars[start:end]] == self.clauseSigns[start:end]
+                satisfied = np.logical_or.reduceat(satisfied, self.clausePtr[clauses] - start, axis=1)
+                values += satisfied.astype(np.int64) @ self.weights[clauses]
+            first = last
+        return values
 
     def getNumberOfVariables(self):
         return self.nvar
 
     def getNumberOfClauses(self):
         return self.nclauses
+
+    """
+    The instance in flat numpy arrays, e.g., to store it in shared memory (see parallel_recombination.py):
+        - "shape": the number of variables and clauses (nvar, nclauses)
+        - "clause_ptr", "clause_vars", "clause_signs", "weights": the CSR arrays of the clauses (see the description of the class)
+        - "hard", "top": the hard clauses and their weight (-1 if there is none)
+    """
+    def toArrays(self):
+        return {
+            "shape": np.array([self.nvar, self.nclauses], dtype=np.int64),
+            "clause_ptr": self.clausePtr,
+            "clause_vars": self.clauseVars,
+            "clause_signs": self.clauseSigns,
+            "weights": self.weights,
+            "hard": self.hard,
+            "top": np.array([-1 if self.top is None else self.top], dtype=np.int64),
+        }
+
+    # Create an instance from the arrays returned by toArrays. The arrays are used without being copied
+    @classmethod
+    def fromArrays(cls, arrays):
+        inst = cls.__new__(cls)
+        inst.nvar, inst.nclauses = [int(v) for v in arrays["shape"]]
+        inst.clausePtr = arrays["clause_ptr"]
+        inst.clauseVars = arrays["clause_vars"]
+        inst.clauseSigns = arrays["clause_signs"]
+        inst.weights = arrays["weights"]
+        inst.hard = arrays["hard"]
+        inst.top = None if arrays["top"][0] == -1 else int(arrays["top"][0])
+        inst.createViews()
+        return inst
+
+    # save the instance in binary files, in 'directory' (see instance_cache.py)
+    def save(self, directory):
+        saveArrays(directory, self.toArrays(), {"class": "MAXSAT"})
+
+    # load an instance saved by save. With mmap_mode="r", the arrays are memory maps of the files, shared by all the processes that load them
+    @classmethod
+    def load(cls, directory, mmap_mode="r"):
+        return cls.fromArrays(loadArrays(directory, mmap_mode)[0])
+
+    # The instance in 'inst_file', loaded from its binary cache (see instance_cache.cachedArrays), which is created, or updated, if needed.
+    # The cache is in 'cache_dir' (by default, the directory of inst_file)
+    @classmethod
+    def cached(cls, inst_file, cache_dir=None, mmap_mode="r"):
+        return cls.fromArrays(cachedArrays(inst_file, lambda: cls(inst_file).toArrays(), cache_dir, mmap_mode))
@@ -7,11 +7,14 @@ The implementation is done assuming minimization instead of maximization, as in
 
 from Graph import Graph
 import numpy as np
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from CliqueConfiguration import *
 
 from PX import * # PX class defined according with the problem
-
-sf = None # list of tuples
+import instance
 
 # get a binary array from an integer b with n_bits representation
 def getBinaryArray(b, n_bits):
@@ -27,8 +30,9 @@ def binArrayToInt(bin_array):
     return val
 
 # returns the recombination graph
-def createRecombinationGraph(sub_funcs):
-    rec_graph = Graph()
+# 'backend' is the backend of the Graph class ("native" or "networkx") and 'ordering' the elimination ordering used to triangulate it
+def createRecombinationGraph(sub_funcs, backend="native", ordering="mcs"):
+    rec_graph = Graph(backend, ordering)
 
     for sf in sub_funcs:
         f_len = len(sf)
@@ -157,7 +161,7 @@ def getCompleteDecisions(cliques, cliqueConfigs, cliqueTree):
 
 # get the objective value for the sub-functions (tuples) in the clique, given the choices for its variables
 # 'total_vars' have the clique's separator and residue variables; 'total_decisions' have the corresponding decisions, where the value in each position corresponds to the variable in the same position in 'total_vars'.
-def getPartialObjectiveValue(rec_graph, clique, total_vars, total_decisions):
+def getPartialObjectiveValue(rec_graph, clique, total_vars, total_decisions, px, sf):
     aux = 0
     sub_funcs = rec_graph.getCliqueSubFunctions(clique) # get the sub-functions assigned to this clique
 
@@ -169,9 +173,14 @@ def getPartialObjectiveValue(rec_graph, clique, total_vars, total_decisions):
 
 
     # call the 'evaluate' function, defined in the PX class for each sub-function
+    # If PX has the (optional) 'evaluate_table' function, the value is taken from the table of the sub-function instead
+    has_tables = hasattr(px, "evaluate_table")
     for sf_ix in sub_funcs:
         t = tuple([decisions_aux[i] for i in sf[sf_ix]]) # create the tuple for sub-function sf_ix
-        aux += px.evaluate(sf_ix, t)
+        if has_tables:
+            aux += px.evaluate_table(sf_ix)[binArrayToInt(t)]
+        else:
+            aux += px.evaluate(sf_ix, t)
 
     return aux
 
@@ -202,8 +211,15 @@ def getCliqueChildrenEvaluation(aux, total_vars, total_decisions, clique, rec_gr
 
 
 # the dynamic programming algorithm that decides how the offspring should be constructed
+# 'px' is the PX instance of the current recombination and 'sf' the sub-functions it created
+# If 'end_time' (a value of time.monotonic()) is given, RecombinationBudgetExceeded is raised when it is reached (checked before each clique)
+
+def doOptimalRecombination(rec_graph, px, sf, end_time=None):
+    off_decisions, off_variables, off_value = optimizeCliqueTree(rec_graph, px, sf, end_time)
+    return sortDecisions(off_variables, off_decisions, px.components())
 
-def doOptimalRecombination(rec_graph):
+# the dynamic programming over the clique tree of rec_graph. Returns the decisions, the corresponding variables and the optimal value (see getCompleteDecisions)
+def optimizeCliqueTree(rec_graph, px, sf, end_time=None):
 
     cliques = rec_graph.getCliqueTreePostOrder() # get the cliques in the clique tree in post-order
     clique_tree = rec_graph.getCliqueTree() # get the clique tree
@@ -222,6 +238,7 @@ def doOptimalRecombination(rec_graph):
 
     # the cliques list has the cliques in post-order
     for clique in cliques:
+        checkDeadline(end_time)
         clique_id =clique_tree.nodes[clique]["id"]
 
         separator = rec_graph.getCliqueSeparator(clique)
@@ -238,7 +255,7 @@ def doOptimalRecombination(rec_graph):
                 total_vars, total_decisions = getFullDecision(separator, x_s, residue, x_r)
 
                 # get the objective value for this combination of choices in the separator and residue
-                aux = getPartialObjectiveValue(rec_graph, clique, total_vars, total_decisions)
+                aux = getPartialObjectiveValue(rec_graph, clique, total_vars, total_decisions, px, sf)
 
                 aux += getCliqueChildrenEvaluation(aux, total_vars, total_decisions, clique, rec_graph, evaluatedCliques, cliqueConfigs)
 
@@ -250,46 +267,692 @@ def doOptimalRecombination(rec_graph):
 
 
     # get the final decisions for each variable (component)
-    off_decisions, off_variables, off_value = getCompleteDecisions(cliques, cliqueConfigs, clique_tree)
+    return getCompleteDecisions(cliques, cliqueConfigs, clique_tree)
 
 
-    # sort the decisions so that they are arranged in increasing order according to the associated component (variable).
-    # In t, each position represents a component and its value is the associated parent choice.
-    t = [-1]*len(off_variables)
+# sort the decisions so that they are arranged in increasing order according to the associated component (variable).
+# In t, each position represents a component and its value is the associated parent choice.
+# Components that are not in any sub-function (and, therefore, not in the clique tree) do not change the objective value and are taken from the first parent.
+def sortDecisions(off_variables, off_decisions, n_components):
+    t = [0]*n_components
     for i in range(len(off_variables)):
         t[off_variables[i]] = off_decisions[i]
 
     return tuple(t) # return in tuple form
 
 
+"""
+Vectorized version of the dynamic programming algorithm.
+Instead of going through every pair (x_s, x_r), the objective value of all the combinations of a clique is stored in a tensor with one axis (of size 2) for each of the clique's variables: first the separator's variables and then the residue's.
+The tables of the sub-functions and the values of the children are added to this tensor by broadcasting, and the best residue combination for each separator combination is the argmin over the residue's axes.
+The result (including ties, where the first combination is kept) is the same as in doOptimalRecombination.
+"""
+
+# get the objective value of sub-function sf_ix for all the 2^len(sf[sf_ix]) combinations of its variables.
+# The position of each combination is the integer represented by the binary array t (as in binArrayToInt)
+# Uses the (optional) 'evaluate_table' function of PX, if it exists. Otherwise, 'evaluate' is called for each combination.
+def getSubFunctionTable(px, sf, sf_ix):
+    if hasattr(px, "evaluate_table"):
+        return px.evaluate_table(sf_ix)
+
+    n_vars = len(sf[sf_ix])
+    return np.array([px.evaluate(sf_ix, tuple(getBinaryArray(b, n_vars))) for b in range(2**n_vars)], dtype=float)
+
+# Reshape 'table', indexed by the binary combinations of 'table_vars', so that it can be added to the tensor of a clique.
+# 'clique_pos' maps each variable of the clique to its axis in the tensor. The axes of the variables that are not in 'table_vars' have size 1.
+# If a variable appears more than once in 'table_vars', only the combinations where all its occurrences have the same value are used (the diagonal).
+def alignTable(table, table_vars, clique_pos):
+    axes = [clique_pos[v] for v in table_vars]
+    out_axes = sorted(set(axes))
+    aligned = np.einsum(table.reshape((2,)*len(table_vars)), axes, out_axes)
+
+    shape = [1]*len(clique_pos)
+    for a in out_axes:
+        shape[a] = 2
+    return aligned.reshape(shape)
+
+def doOptimalRecombinationVectorized(rec_graph, px, sf, end_time=None):
+    off_decisions, off_variables, off_value = optimizeCliqueTreeVectorized(rec_graph, px, sf, end_time)
+    return sortDecisions(off_variables, off_decisions, px.components())
+
+def optimizeCliqueTreeVectorized(rec_graph, px, sf, end_time=None):
+
+    cliques = rec_graph.getCliqueTreePostOrder() # get the cliques in the clique tree in post-order
+    clique_tree = rec_graph.getCliqueTree() # get the clique tree
+    evaluatedCliques = [False]*len(cliques)
+    cliqueConfigs = [[]]*len(cliques)
+
+    # the cliques list has the cliques in post-order
+    for clique in cliques:
+        checkDeadline(end_time)
+        clique_id = clique_tree.nodes[clique]["id"]
+
+        separator = rec_graph.getCliqueSeparator(clique)
+        residue = rec_graph.getCliqueResidue(clique)
+        cliqueConfigs[clique_id] = CliqueConfiguration(clique_id, clique_id, clique, separator, residue)
+
+        clique_vars = list(separator) + list(residue)
+        clique_pos = {clique_vars[i]: i for i in range(len(clique_vars))}
+
+        cost = np.zeros((2,)*len(clique_vars))
+
+        # objective value of the sub-functions assigned to this clique
+        for sf_ix in rec_graph.getCliqueSubFunctions(clique):
+            cost += alignTable(getSubFunctionTable(px, sf, sf_ix), sf[sf_ix], clique_pos)
+
+        # best values of the children (already evaluated) for the combinations of their separators
+        for c in list(clique_tree.neighbors(clique)):
+            id = clique_tree.nodes[c]['id']
+            if evaluatedCliques[id]:
+                cost += alignTable(cliqueConfigs[id].getAllValues(), cliqueConfigs[id].getSeparator(), clique_pos)
+
+        cost = cost.reshape(2**len(separator), 2**len(residue)) # rows are the separator combinations and columns the residue combinations
+        best = np.argmin(cost, axis=1) # we are minimizing
+
+        cliqueConfigs[clique_id].setAllValues(cost[np.arange(len(best)), best])
+        cliqueConfigs[clique_id].setAllVariables(best)
+
+        evaluatedCliques[clique_id] = True # set this clique as evaluated
+
+    return getCompleteDecisions(cliques, cliqueConfigs, clique_tree)
+
+
 def parentsAreEqual(p1, p2):
-    for i in range(len(p1)):
-        if(p1[i] != p2[i]):
-            return False
+    return np.array_equal(p1, p2)
+
+
+# Value (for minimization) of the choices t, i.e., the sum of the values of all sub-functions in PX for the choices in t
+def getChoicesValue(px, sf, t):
+    value = 0
+    for sf_ix in range(len(sf)):
+        value += px.evaluate(sf_ix, tuple([t[v] for v in sf[sf_ix]]))
+    return value
+
+# Value (for minimization) of the first parent in PX, i.e., of all choices equal to 0 (computed from the tables, see getSubFunctionTable)
+def getFirstParentValue(px, sf):
+    value = 0
+    for sf_ix in range(len(sf)):
+        value += getSubFunctionTable(px, sf, sf_ix)[0]
+    return value
+
+"""
+Fitness of the offspring.
+The sub-functions of the instance that are not in PX (none of their variables differ between the parents) have the same value in both parents and in the offspring.
+So, given the fitness f1 of p1, the fitness of the offspring is f1 minus the difference between the values (for minimization) of the offspring and p1 in PX,
+where the value of the offspring is the optimal value found by the dynamic programming. This avoids a full evaluation of the offspring.
+"""
+def getOffspringFitness(fitness1, off_value, p1_value):
+    return fitness1 - (off_value - p1_value)
 
-    return True
 
+"""
+Independent components.
+The recombination graph is usually split into many connected components (the partitions of the partition crossover).
+Each component is an independent problem: it gets its own recombination graph, clique tree and dynamic programming, and the decisions of all components are merged.
+"""
+
+# Find the connected components of the recombination graph of the sub-functions 'sf' (with variables from 0 to n_vars-1) with union-find, without building the graph.
+# Returns a list with the variables and the indices (in sf) of the sub-functions of each component. The variables that are not in any sub-function are not in any component.
+def findComponents(sf, n_vars):
+    parent = list(range(n_vars))
+
+    def find(v):
+        while parent[v] != v:
+            parent[v] = parent[parent[v]] # path halving
+            v = parent[v]
+        return v
+
+    for t in sf:
+        root = find(t[0])
+        for v in t[1:]:
+            r = find(v)
+            if r != root:
+                parent[r] = root
+
+    components = {} # root -> (variables, sub-functions)
+    for sf_ix in range(len(sf)):
+        root = find(sf[sf_ix][0])
+        if root not in components:
+            components[root] = ([], [])
+        components[root][1].append(sf_ix)
+
+    used = [False]*n_vars
+    for t in sf:
+        for v in t:
+            if not used[v]:
+                used[v] = True
+                components[find(v)][0].append(v)
+
+    return list(components.values())
+
+"""
+The problem of one component, with the same methods of PX used by the dynamic programming.
+The sub-function i of the component is the sub-function sf_indices[i] of px. The variables keep their numbers in px.
+"""
+class ComponentPX:
+
+    def __init__(self, px, variables, sf_indices):
+        self.px = px
+        self.variables = variables
+        self.sf_indices = sf_indices
+        self.sfs = [px.subfunctions()[i] for i in sf_indices]
+
+    def components(self):
+        return len(self.variables)
+
+    def subfunctions(self):
+        return self.sfs
+
+    def evaluate(self, i, t):
+        return self.px.evaluate(self.sf_indices[i], t)
+
+    def evaluate_table(self, i):
+        return getSubFunctionTable(self.px, self.px.subfunctions(), self.sf_indices[i])
+
+# Solve a small component (e.g., an isolated variable) directly, by evaluating all the combinations of its variables, without the recombination graph.
+# Returns the decisions, the corresponding variables and the optimal value, as in optimizeCliqueTree. Ties are broken in favour of the first combination (the first parent).
+def solveSmallComponent(cpx):
+    variables = cpx.variables
+    n_vars = len(variables)
+    position = {variables[i]: i for i in range(n_vars)}
+    combinations = (np.arange(2**n_vars)[:, None] >> np.arange(n_vars-1, -1, -1)) & 1 # row b is the binary array of b
+
+    cost = np.zeros(2**n_vars)
+    sf = cpx.subfunctions()
+    for sf_ix in range(len(sf)):
+        columns = [position[v] for v in sf[sf_ix]]
+        table_ix = combinations[:, columns].dot(1 << np.arange(len(columns)-1, -1, -1))
+        cost += getSubFunctionTable(cpx, sf, sf_ix)[table_ix]
+
+    best = int(np.argmin(cost)) # we are minimizing
+    return combinations[best].tolist(), variables, cost[best]
+
+# Create the recombination graph (with the sub-functions assigned to the clique tree) of each component
+def createComponentGraphs(px, components, backend="native", ordering="mcs"):
+    graphs = []
+    for variables, sf_indices in components:
+        cpx = ComponentPX(px, variables, sf_indices)
+        rec_graph = createRecombinationGraph(cpx.subfunctions(), backend, ordering)
+        rec_graph.assignSubFuncs(cpx.subfunctions())
+        graphs.append((cpx, rec_graph))
+    return graphs
+
+
+"""
+Cache of the structure of the recombinations.
+For the same instance, the set of different variables of the parents completely defines the sub-functions of PX, the components, their recombination graphs and clique trees (post-order, separators, residues and sub-functions of each clique).
+Only the values of the sub-functions depend on the parents, so this structure (a plan, see createPlan) can be reused by all the pairs of parents with the same different variables.
+The cache keeps the 'maxsize' most recently used plans, and counts the hits, misses and evictions. It can be shared by many threads.
+"""
+class PlanCache:
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.plans = OrderedDict() # key -> plan, from the least to the most recently used
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # the key of the recombination in px: the different variables of the parents, or px.structure_key() if the sub-functions of px also depend on the values of the common variables (e.g., in MaxSAT)
+    @staticmethod
+    def key(px):
+        if hasattr(px, "structure_key"):
+            return px.structure_key()
+        return px.diffVars.tobytes()
+
+    # get the plan with the given key, or None (a miss)
+    def get(self, key):
+        with self.lock:
+            plan = self.plans.get(key)
+            if plan is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.plans.move_to_end(key)
+            return plan
+
+    def put(self, key, plan):
+        with self.lock:
+            self.plans[key] = plan
+            self.plans.move_to_end(key)
+            while len(self.plans) > self.maxsize:
+                self.plans.popitem(last=False)
+                self.evictions += 1
+
+    # the plans in the cache, as a list of (key, plan), e.g., to put them in the cache of another process
+    def items(self):
+        with self.lock:
+            return list(self.plans.items())
+
+    def clear(self):
+        with self.lock:
+            self.plans.clear()
+            self.hits, self.misses, self.evictions = 0, 0, 0
+
+    # counters of the cache, in a dictionary
+    def info(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "size": len(self.plans), "maxsize": self.maxsize}
+
+    # the lock is not pickled, so that a Recombiner with a cache can be sent to other processes
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+# The structure of the recombination in px: the components with up to 'trivial_size' variables (solved by solveSmallComponent) and the other components, together with their recombination graphs and the cost of their dynamic programming (see getDPCost).
+# The recombination graphs are only read by the dynamic programming, so the same plan can be used by many recombinations at the same time.
+def createPlan(px, sf, trivial_size=2, backend="native", ordering="mcs"):
+    components = findComponents(sf, px.components())
+    small = [c for c in components if len(c[0]) <= trivial_size]
+    graphs = [(cpx.variables, cpx.sf_indices, rec_graph, getDPCost(rec_graph, cpx.subfunctions())) for cpx, rec_graph in createComponentGraphs(px, [c for c in components if len(c[0]) > trivial_size], backend, ordering)]
+    return small, graphs
+
+
+# Get the values (for minimization) of both parents in the problem given by PX, i.e., the sum of the sub-functions when all the choices are 0 (p1) or 1 (p2)
+def getParentsValues(px, sf):
+    v1, v2 = 0, 0
+    for sf_ix in range(len(sf)):
+        v1 += px.evaluate(sf_ix, (0,)*len(sf[sf_ix]))
+        v2 += px.evaluate(sf_ix, (1,)*len(sf[sf_ix]))
+    return v1, v2
+
+# Choose variables to remove from the cliques with more than beta variables, until each of these cliques has, at most, beta variables.
+# The cliques are visited from the largest to the smallest, and the variables in more of these cliques are chosen first.
+def getVariablesToFix(cliques, beta):
+    large = sorted([c for c in cliques if len(c) > beta], key=len, reverse=True)
+
+    count = {} # number of large cliques of each variable
+    for c in large:
+        for v in c:
+            count[v] = count.get(v, 0) + 1
+
+    fixed = set()
+    for c in large:
+        remaining = [v for v in c if v not in fixed]
+        excess = len(remaining) - beta
+        if excess > 0:
+            remaining.sort(key=lambda v: count[v], reverse=True)
+            fixed.update(remaining[:excess])
+
+    return fixed
+
+
+"""
+Quasi-optimal recombination, as in the paper (Chicano et al., 2019): the number of variables in each clique is limited to beta.
+While the clique tree has a clique with more than beta variables, some of its variables (see getVariablesToFix) are fixed to the value they have in the best parent, which removes them from the recombination graph.
+Fixing a variable is done by giving it the same value in both parents, so a new PX (and recombination graph) is created after each round.
+Returns the new PX, sub-functions and recombination graph, and False if any variable was fixed (i.e., the result is not guaranteed to be optimal) or True otherwise.
+"""
+def boundCliqueSize(px, sf, rec_graph, beta, backend="native", ordering="mcs"):
+    if beta < 1:
+        raise ValueError("beta must be at least 1")
+
+    p1, p2 = px.p1, px.p2
+    p1_is_best = None
+    optimal = True
+
+    while len(sf) > 0 and max(len(c) for c in rec_graph.getCliques()) > beta:
+        if p1_is_best is None:
+            v1, v2 = getParentsValues(px, sf)
+            p1_is_best = v1 <= v2 # we are minimizing
+
+        fixed = [px.varsMapInv[v] for v in getVariablesToFix(rec_graph.getCliques(), beta)]
+
+        # the variables in 'fixed' get the value of the best parent in both parents
+        if p1_is_best:
+            p2 = p2.copy()
+            p2[fixed] = p1[fixed]
+        else:
+            p1 = p1.copy()
+            p1[fixed] = p2[fixed]
+        optimal = False
+
+        px = PX(p1, p2, px.instance)
+        sf = px.subfunctions()
+        rec_graph = createRecombinationGraph(sf, backend, ordering)
 
-def recombine(p1, p2):
-    global sf
-    global px
+    return px, sf, rec_graph, optimal
 
-    # if both parents are equal, just return one of the parents
-    if(parentsAreEqual(p1, p2)):
-        return p1
 
-    # instanciate the classe PX, defined according with the problem
-    px = PX(p1, p2)
+"""
+Budgets of a recombination.
+Before any table of the dynamic programming is allocated, its exact cost is computed from the clique tree (see getDPCost) and compared with the budgets given to 'recombine':
+    - max_cells: maximum number of combinations evaluated by the dynamic programming, i.e., the sum of 2^(|separator|+|residue|) for all cliques
+    - max_bytes: maximum memory, in bytes, used by the tables
+    - deadline: maximum time, in seconds, of the recombination (also checked during the dynamic programming)
+If a budget is exceeded, the recombination follows the 'fallback' policy:
+    - "raise": raises RecombinationBudgetExceeded
+    - "parent": returns the best parent
+    - "bounded": reduces the maximum number of variables per clique (beta, see boundCliqueSize) until the cost is within the budgets. If that is not possible, or if the deadline is reached, the best parent is returned.
+"""
+FALLBACKS = ["raise", "parent", "bounded"]
+
+class RecombinationBudgetExceeded(Exception):
+
+    def __init__(self, message, cells=None, bytes=None):
+        super().__init__(message)
+        self.cells = cells # cost of the dynamic programming that exceeded the budget (None if it was the deadline)
+        self.bytes = bytes
+
+def checkDeadline(end_time):
+    if end_time is not None and time.monotonic() > end_time:
+        raise RecombinationBudgetExceeded("The deadline of the recombination was reached")
+
+# Exact cost of the dynamic programming for the clique tree of rec_graph.
+# Returns the number of cells (combinations of the separator and residue of all cliques) and the peak memory, in bytes, of the tables:
+# the tables of the sub-functions (see getSubFunctionTable), the 'value' and 'variables' arrays of the CliqueConfiguration of each clique, and the tensor of the largest clique (see doOptimalRecombinationVectorized) together with its argmin
+def getDPCost(rec_graph, sf):
+    cells = 0
+    table_bytes = 0
+    largest = 0
+
+    for c in rec_graph.getCliques():
+        sep_len = len(rec_graph.getCliqueSeparator(c))
+        res_len = len(rec_graph.getCliqueResidue(c))
+        cells += 2**(sep_len+res_len)
+        table_bytes += 16*2**sep_len
+        largest = max(largest, 2**(sep_len+res_len))
+
+    for t in sf:
+        table_bytes += 8*2**len(t)
+
+    return cells, table_bytes + 16*largest
+
+def isWithinBudget(cost, max_cells, max_bytes):
+    cells, bytes = cost
+    return (max_cells is None or cells <= max_cells) and (max_bytes is None or bytes <= max_bytes)
+
+"""
+Check the cost of the dynamic programming against the budgets.
+With the "bounded" fallback, beta is reduced (starting from the size of the largest clique) until the cost is within the budgets.
+Returns the PX, sub-functions, recombination graph and optimality flag to use, or raises RecombinationBudgetExceeded.
+"""
+def applyBudget(px, sf, rec_graph, optimal, max_cells, max_bytes, end_time, fallback, backend="native", ordering="mcs"):
+    checkDeadline(end_time)
+    cost = getDPCost(rec_graph, sf)
+    if isWithinBudget(cost, max_cells, max_bytes):
+        return px, sf, rec_graph, optimal
+
+    if fallback == "bounded":
+        beta = max(len(c) for c in rec_graph.getCliques())
+        while beta > 1:
+            beta -= 1
+            px, sf, rec_graph, beta_optimal = boundCliqueSize(px, sf, rec_graph, beta, backend, ordering)
+            optimal = optimal and beta_optimal
+            checkDeadline(end_time)
+            cost = getDPCost(rec_graph, sf)
+            if isWithinBudget(cost, max_cells, max_bytes):
+                return px, sf, rec_graph, optimal
+
+    raise RecombinationBudgetExceeded("The cost of the recombination ({0} cells, {1} bytes) exceeds the budget".format(cost[0], cost[1]), cost[0], cost[1])
+
+# True if the plan (see createPlan) has no clique with more than beta variables and the cost of its components is within the budgets (beta, max_cells and max_bytes may be None)
+def isPlanWithinLimits(plan, beta, max_cells, max_bytes):
+    small, compiled = plan
+    if beta is not None:
+        sizes = [len(variables) for variables, _ in small] + [len(c) for _, _, rec_graph, _ in compiled for c in rec_graph.getCliques()]
+        if len(sizes) > 0 and max(sizes) > beta:
+            return False
+
+    cells = sum(cost[0] for _, _, _, cost in compiled)
+    bytes = sum(cost[1] for _, _, _, cost in compiled)
+    return isWithinBudget((cells, bytes), max_cells, max_bytes)
 
-    # get the sub-functions resulted from the union of the parents in PX
-    sf = px.subfunctions()
 
-    # creates the recombination graph, the clique tree, and everything needed in between
-    rec_graph = createRecombinationGraph(sf)
+"""
+Performs the recombination for a given problem instance.
+Everything needed by a recombination (the PX instance, the sub-functions, the recombination graph and the clique configurations) is created in each call to 'recombine' and is never stored in the object, so the same Recombiner can be shared by many threads.
+The only exception is the cache of plans (see PlanCache), which is only read by the recombinations and is protected by a lock.
+"""
+class Recombiner:
+
+    # If 'vectorized' is True, the dynamic programming uses doOptimalRecombinationVectorized instead of doOptimalRecombination
+    # 'backend' is the backend used by the recombination graph ("native" or "networkx", see the Graph class)
+    # 'ordering' is the elimination ordering used to triangulate the recombination graph ("mcs", "min-fill", "min-degree" or "auto")
+    # 'fallback' is the policy followed when a budget of a recombination is exceeded ("raise", "parent" or "bounded", see FALLBACKS)
+    # The independent components of a recombination are solved by a pool of 'workers' threads when the sum of their costs (number of cells, see getDPCost) is at least 'parallel_cells'.
+    # Components with up to 'trivial_size' variables are solved directly (see solveSmallComponent), without the recombination graph.
+    # The structure of the last 'cache_size' different sets of different variables is kept in a PlanCache (None or 0 disables it)
+    def __init__(self, inst, vectorized=True, backend="native", ordering="mcs", fallback="raise", workers=1, parallel_cells=2**16, trivial_size=2, cache_size=128):
+        if fallback not in FALLBACKS:
+            raise ValueError("Unknown fallback policy: {0}".format(fallback))
+
+        self.instance = inst # the problem instance (e.g., NKLandscape or MAXSAT), only read during the recombinations
+        self.vectorized = vectorized
+        self.backend = backend
+        self.ordering = ordering
+        self.fallback = fallback
+        self.workers = workers
+        self.parallel_cells = parallel_cells
+        self.trivial_size = trivial_size
+        self.cache = PlanCache(cache_size) if cache_size else None
+
+    # If 'flipped' is True, only the array with the variables where the offspring differs from p1 is returned (see PX.offspring)
+    # If 'beta' is given, no clique has more than beta variables (see boundCliqueSize).
+    # 'max_cells', 'max_bytes' and 'deadline' are the budgets of the recombination, and 'fallback' replaces the policy given in the constructor (see RecombinationBudgetExceeded).
+    # If 'beta' or any budget is given, a tuple (offspring, optimal) is returned, where 'optimal' is True if the offspring is guaranteed to be optimal
+    # If 'return_fitness' is True, the fitness of the offspring (a float) is added to the end of the result, e.g., (offspring, fitness).
+    # When the fitness of p1, 'fitness1', is given, the fitness of the offspring is computed from the value of the dynamic programming (see getOffspringFitness). Otherwise, the offspring is fully evaluated.
+    def recombine(self, p1, p2, flipped=False, beta=None, max_cells=None, max_bytes=None, deadline=None, fallback=None, return_fitness=False, fitness1=None):
+        budgets = max_cells is not None or max_bytes is not None or deadline is not None
+        quasi_optimal = beta is not None or budgets
+        end_time = None if deadline is None else time.monotonic() + deadline
+        fallback = self.fallback if fallback is None else fallback
+        if fallback not in FALLBACKS:
+            raise ValueError("Unknown fallback policy: {0}".format(fallback))
+
+        # if both parents are equal, just return one of the parents
+        if(parentsAreEqual(p1, p2)):
+            off = np.array([], dtype=int) if flipped else np.array(p1, copy=True) # a new array, as in the other cases
+            result = (off, True) if quasi_optimal else (off,)
+            if return_fitness:
+                result += (float(self.instance.evaluateSolution(p1) if fitness1 is None else fitness1),)
+            return result if len(result) > 1 else off
+
+        # instanciate the classe PX, defined according with the problem
+        px = PX(p1, p2, self.instance)
+
+        # get the sub-functions resulted from the union of the parents in PX
+        sf = px.subfunctions()
+
+        if not quasi_optimal:
+            # perform the optimal recombination in each component
+            t, off_value = self.recombineComponents(px, sf)
+            off = px.offspring(t, flipped) # return the offspring according with the choices in t
+            if not return_fitness:
+                return off
+            if fitness1 is None:
+                return off, float(self.instance.evaluateSolution(px.offspring(t)))
+            return off, float(getOffspringFitness(fitness1, off_value, getFirstParentValue(px, sf)))
+
+        # creates the recombination graph, the clique tree, and everything needed in between
+        rec_graph = createRecombinationGraph(sf, self.backend, self.ordering)
+
+        original_px, original_sf = px, sf
+        optimal = True
+        try:
+            if beta is not None:
+                px, sf, rec_graph, optimal = boundCliqueSize(px, sf, rec_graph, beta, self.backend, self.ordering)
+
+            if budgets:
+                px, sf, rec_graph, optimal = applyBudget(px, sf, rec_graph, optimal, max_cells, max_bytes, end_time, fallback, self.backend, self.ordering)
+
+            rec_graph.assignSubFuncs(sf)
+            t = self.doOptimalRecombination(rec_graph, px, sf, end_time)
+
+        except RecombinationBudgetExceeded:
+            if fallback == "raise":
+                raise
+
+            # the best parent is returned
+            px = original_px
+            v1, v2 = getParentsValues(px, original_sf)
+            t = (0 if v1 <= v2 else 1,)*px.components()
+            optimal = False
+
+        # the parents in px may have fixed variables, so the flipped variables are found from the offspring
+        off = px.offspring(t)
+        if return_fitness:
+            if fitness1 is None:
+                fitness = float(self.instance.evaluateSolution(off))
+            else:
+                # the choices of the offspring in the original PX
+                original_t = (off[original_px.diffVars] != original_px.p1[original_px.diffVars]).astype(int)
+                fitness = float(getOffspringFitness(fitness1, getChoicesValue(original_px, original_sf, original_t), getChoicesValue(original_px, original_sf, [0]*len(original_t))))
+        if flipped:
+            off = np.flatnonzero(off != np.asarray(p1))
+        return (off, optimal, fitness) if return_fitness else (off, optimal)
+
+    # Predicted work of the recombination of p1 and p2, computed from the reduced sub-functions and the triangulation of the recombination graph, without the dynamic programming.
+    # Returns a tuple with the number of different variables, the maximum number of variables in a clique and the sum of 2^|clique| for all cliques (see getDPCost for the exact cost)
+    # The cliques are the ones of the plan of the recombination (see getPlan), so the plan is cached and not created again by recombine. The variables of a small component (see solveSmallComponent) are counted as one clique
+    def estimate_cost(self, p1, p2):
+        if(parentsAreEqual(p1, p2)):
+            return 0, 0, 0
+
+        px = PX(p1, p2, self.instance)
+        small, compiled = self.getPlan(px, px.subfunctions())
+        sizes = [len(variables) for variables, _ in small] + [len(c) for _, _, rec_graph, _ in compiled for c in rec_graph.getCliques()]
+        if len(sizes) == 0:
+            return px.components(), 0, 0
+
+        return px.components(), max(sizes), sum(2**size for size in sizes)
+
+    # The plan of the recombination in px (see createPlan), taken from the cache when possible
+    def getPlan(self, px, sf):
+        if self.cache is None:
+            return createPlan(px, sf, self.trivial_size, self.backend, self.ordering)
+
+        key = PlanCache.key(px)
+        plan = self.cache.get(key)
+        if plan is None:
+            plan = createPlan(px, sf, self.trivial_size, self.backend, self.ordering)
+            self.cache.put(key, plan)
+        return plan
+
+    # counters of the cache of plans (see PlanCache.info), or None if there is no cache
+    def cache_info(self):
+        return None if self.cache is None else self.cache.info()
+
+    # Split the problem in PX into its components (see findComponents), solve each of them independently and merge their decisions in t
+    # The small components are solved directly, and only the others need the recombination graph and the dynamic programming
+    # Returns t and its value (the sum of the optimal values of all components)
+    def recombineComponents(self, px, sf):
+        return self.solvePlan(px, self.getPlan(px, sf))
+
+    # Solve the components of the recombination in px with the given plan (see createPlan), which must be the plan of the different variables of px
+    # If 'end_time' is given, the dynamic programming raises RecombinationBudgetExceeded when it is reached
+    def solvePlan(self, px, plan, end_time=None):
+        small, compiled = plan
+
+        results = [solveSmallComponent(ComponentPX(px, variables, sf_indices)) for variables, sf_indices in small]
+        graphs = [(ComponentPX(px, variables, sf_indices), rec_graph) for variables, sf_indices, rec_graph, _ in compiled]
+
+        def solve(graph):
+            cpx, rec_graph = graph
+            return self.optimizeCliqueTree(rec_graph, cpx, cpx.subfunctions(), end_time)
+
+        if self.workers > 1 and len(graphs) > 1 and sum(cost[0] for _, _, _, cost in compiled) >= self.parallel_cells:
+            with ThreadPoolExecutor(self.workers) as pool:
+                results.extend(pool.map(solve, graphs))
+        else:
+            results.extend(solve(graph) for graph in graphs)
 
-    # assign the sub-functions to the clique tree created from the recombination graph
-    rec_graph.assignSubFuncs(sf)
+        t = [0]*px.components()
+        value = 0
+        for off_decisions, off_variables, off_value in results:
+            value += off_value
+            for v, d in zip(off_variables, off_decisions):
+                t[v] = d
+        return tuple(t), value
 
-    # perform the optimal recombination
-    t = doOptimalRecombination(rec_graph)
-    return px.offspring(t) # return the offspring according with the choices in t
+    """
+    Recombine the pairs of parents in the rows of the 2d arrays P1 and P2 (with shape (B, n)).
+    The different variables of all pairs are found at once, and the pairs are grouped by their different variables: the PX sub-functions and the plan (see createPlan) are created once per group (and once per set of sub-functions, when they also depend on the common variables, see PlanCache.key).
+    Returns the offspring, in a 2d array with the same shape of P1, and an array with their fitnesses.
+    If the fitnesses of the parents in P1, 'fitness1', are given, the fitnesses of the offspring are computed from the dynamic programming (see getOffspringFitness). Otherwise, each offspring is fully evaluated.
+    'beta', 'max_cells', 'max_bytes', 'deadline' and 'fallback' apply to each pair, as in recombine. The pairs whose plan exceeds beta or the budgets (see isPlanWithinLimits) are recombined one by one by recombine.
+    If the deadline of a pair is reached during the dynamic programming, the fallback is applied: "raise" raises RecombinationBudgetExceeded, and the other policies give the best parent.
+    """
+    def recombine_batch(self, P1, P2, fitness1=None, beta=None, max_cells=None, max_bytes=None, deadline=None, fallback=None):
+        P1, P2 = np.asarray(P1), np.asarray(P2)
+        if P1.shape != P2.shape or P1.ndim != 2:
+            raise ValueError("P1 and P2 must be 2d arrays with the same shape")
+        fallback = self.fallback if fallback is None else fallback
+        if fallback not in FALLBACKS:
+            raise ValueError("Unknown fallback policy: {0}".format(fallback))
+        limited = beta is not None or max_cells is not None or max_bytes is not None
+
+        diff = P1 != P2
+        flips = np.zeros(diff.shape, dtype=bool) # variables of each offspring taken from P2
+        fitness = np.zeros(len(P1)) if fitness1 is None else np.array(fitness1, dtype=float)
+
+        # pairs with the same different variables have the same row in 'patterns'; the pairs of equal parents are skipped
+        patterns, groups = np.unique(np.packbits(diff, axis=1), axis=0, return_inverse=True)
+        groups = groups.ravel()
+        for g in range(len(patterns)):
+            pairs = np.flatnonzero(groups == g)
+            if not diff[pairs[0]].any():
+                continue
+
+            px_group = PX(P1[pairs[0]], P2[pairs[0]], self.instance)
+            key = PlanCache.key(px_group)
+            plan = self.getPlan(px_group, px_group.subfunctions())
+
+            for b in pairs:
+                px = px_group.withParents(P1[b], P2[b])
+                sf = px.subfunctions()
+                # the sub-functions of px may differ from the ones of the group (see PlanCache.key)
+                pair_plan = plan if PlanCache.key(px) == key else self.getPlan(px, sf)
+
+                if limited and not isPlanWithinLimits(pair_plan, beta, max_cells, max_bytes):
+                    result = self.recombine(P1[b], P2[b], True, beta, max_cells, max_bytes, deadline, fallback, True, None if fitness1 is None else fitness[b])
+                    flips[b, result[0]] = True
+                    fitness[b] = result[-1]
+                    continue
+
+                try:
+                    t, off_value = self.solvePlan(px, pair_plan, None if deadline is None else time.monotonic() + deadline)
+                except RecombinationBudgetExceeded:
+                    if fallback == "raise":
+                        raise
+                    v1, v2 = getParentsValues(px, sf)
+                    t = (0 if v1 <= v2 else 1,)*px.components()
+                    off_value = getChoicesValue(px, sf, t)
+                flips[b, px.offspring(t, True)] = True
+                if fitness1 is not None:
+                    fitness[b] = getOffspringFitness(fitness[b], off_value, getFirstParentValue(px, sf))
+
+        off = np.where(flips, P2, P1)
+        if fitness1 is None:
+            fitness = np.array([self.instance.evaluateSolution(x) for x in off], dtype=float)
+        return off, fitness
+
+    def optimizeCliqueTree(self, rec_graph, px, sf, end_time=None):
+        if self.vectorized:
+            return optimizeCliqueTreeVectorized(rec_graph, px, sf, end_time)
+        return optimizeCliqueTree(rec_graph, px, sf, end_time)
+
+    def doOptimalRecombination(self, rec_graph, px, sf, end_time=None):
+        if self.vectorized:
+            return doOptimalRecombinationVectorized(rec_graph, px, sf, end_time)
+        return doOptimalRecombination(rec_graph, px, sf, end_time)
+
+
+# cost of the recombination of two parents of the instance in instance.instance (see Recombiner.estimate_cost)
+def estimate_cost(p1, p2):
+    return Recombiner(instance.instance).estimate_cost(p1, p2)
+
+# recombine the pairs of parents in the rows of P1 and P2, of the instance in instance.instance (see Recombiner.recombine_batch)
+def recombine_batch(P1, P2, fitness1=None, beta=None, max_cells=None, max_bytes=None, deadline=None, fallback=None):
+    return Recombiner(instance.instance).recombine_batch(P1, P2, fitness1, beta, max_cells, max_bytes, deadline, fallback)
+
+# recombine two parents of the instance in instance.instance
+def recombine(p1, p2, flipped=False, beta=None, max_cells=None, max_bytes=None, deadline=None, fallback=None, return_fitness=False, fitness1=None):
+    return Recombiner(instance.instance).recombine(p1, p2, flipped, beta, max_cells, max_bytes, deadline, fallback, return_fitness, fitness1)
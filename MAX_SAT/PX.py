@@ -1,12 +1,17 @@
 
+import copy
 import instance
+import numpy as np
 class PX:
 
-    def __init__(self, p1, p2):
+    # 'inst' is the problem instance being recombined. If not given, the one in instance.instance is used.
+    def __init__(self, p1, p2, inst=None):
 
-        self.p1 = p1
-        self.p2 = p2
-        self.original_subfunctions = instance.instance.getSubFunctions()
+        self.p1 = np.asarray(p1)
+        self.p2 = np.asarray(p2)
+        self.instance = inst if inst is not None else instance.instance
+        self.original_subfunctions = self.instance.getSubFunctions()
+        self.tables = {} # tables of the new sub-functions already computed by evaluate_table
         self.createSubfunctions()
 
 
@@ -14,46 +19,59 @@ class PX:
     Helper functions
     """
 
-    # Identify common and different variables between the parents
+    # Identify the different variables between the parents
+    # The common variables are not stored: they are all the positions not in self.diffVars, and storing them would cost O(n) in every recombination
     def findCommonVariables(self):
-        self.commonVars = [] # list of common variables
-        self.diffVars = [] # list of the different variables that will compose the new sub-functions sent to the algorithm
-        for i in range(len(self.p1)):
-            if(self.p1[i] != self.p2[i]):
-                self.diffVars.append(i)
-            else:
-                self.commonVars.append(i)
-
-        self.diffVars.sort()
-        self.commonVars.sort()
-
-
-        self.varsMap = {} # mapping original variables *to* new variable (index)
-        self.varsMapInv = {} # inverse mapping of self.varsMap
+        self.diffVars = np.flatnonzero(self.p1 != self.p2) # array (sorted) of the different variables that will compose the new sub-functions sent to the algorithm
 
         # Create a mapping for diffVars so that the corresponding variables in the new sub-functions are numbered consecutively
-        for ix in range(len(self.diffVars)):
-            v = self.diffVars[ix]
-            self.varsMap[v] = ix
-            self.varsMapInv[ix] = v
+        self.varsMapInv = self.diffVars.tolist() # mapping of each new variable (index) to the original variable
+        self.varsMap = {v: ix for ix, v in enumerate(self.varsMapInv)} # inverse mapping of self.varsMapInv: original variables *to* new variable (index)
 
     # create the new sub-functions, by removing the variables with values in common in the original sub-functions
     # the arguments (variables) in the new sub-functions (tuples) are determined according with self.varsMap
     def createSubfunctions(self):
+        # search for common variables (and different)
+        self.findCommonVariables()
+
+        # only the sub-functions with at least one variable in diffVars are considered. They are found with the instance's index of the sub-functions of each variable
+        self.incident = self.instance.getIncidentSubFunctions(self.diffVars)
+        self.reduceSubfunctions(self.findSatisfiedClauses(self.incident))
+
+    # Find the clauses (in the array 'clauses', with at least one different variable each) that are satisfied by a literal of a common variable.
+    # These clauses are satisfied in every offspring, so they do not depend on the choices of the recombination. Returns a boolean array
+    def findSatisfiedClauses(self, clauses):
+        if len(clauses) == 0:
+            return np.zeros(0, dtype=bool)
+
+        inst = self.instance
+        starts = inst.clausePtr[clauses]
+        lens = inst.clausePtr[clauses+1] - starts
+        offsets = np.cumsum(lens) - lens
+
+        # positions, in the CSR arrays of the instance, of the literals of all the clauses
+        positions = np.repeat(starts - offsets, lens) + np.arange(lens.sum())
+        variables = inst.clauseVars[positions]
+        values = self.p1[variables]
+        satisfied = (values == self.p2[variables]) & (values == inst.clauseSigns[positions])
+        return np.logical_or.reduceat(satisfied, offsets)
+
+    # Create the new sub-functions from the incident clauses that are not satisfied by the common variables ('satisfied' is the array returned by findSatisfiedClauses).
+    # The satisfied clauses have the same value in all the offspring, so they are left out of the recombination.
+    # The common variables in the remaining clauses have false literals, which are removed with the rest of common variables
+    def reduceSubfunctions(self, satisfied):
+        self.kept = self.incident[~satisfied] # the original sub-functions of the new ones
         self.sfs = [] # list of tuples, the new sub-functions
         self.sfsMapping = {} # Create a mapping of sub-function indices from the original sub-function to the new one. This is needed to take into account original sub-functions whose variables have the same value in both parents and, as such, there are no remaining variables to create a new sub-function
         self.sfsMappingInv = {} # inverse of self.sfsMapping
 
-        # search for common variables (and different)
-        self.findCommonVariables()
-
-        for s in range(len(self.original_subfunctions)):
+        for s in self.kept.tolist():
             sf = self.original_subfunctions[s]
             n_sf = [] # the new subFunction
 
             # create the new sub-function from sf with only variables with different values in both parents
             for v in sf:
-                if(v in self.diffVars):
+                if(v in self.varsMap):
                     n_sf.append(self.varsMap[v])
 
             if(len(n_sf)>0):
@@ -61,6 +79,46 @@ class PX:
                 self.sfsMappingInv[self.sfsMapping[s]] = s
                 self.sfs.append(tuple(n_sf))
 
+    # Returns the PX of the parents p1 and p2, which must differ in the same variables as self.p1 and self.p2.
+    # The new sub-functions depend on these variables and on the clauses satisfied by the common variables, so they (and their mappings) are only created again if p1 satisfies other clauses than self.p1
+    def withParents(self, p1, p2):
+        px = copy.copy(self)
+        px.p1 = np.asarray(p1)
+        px.p2 = np.asarray(p2)
+        px.tables = {}
+
+        satisfied = px.findSatisfiedClauses(self.incident)
+        if not np.array_equal(self.incident[~satisfied], self.kept):
+            px.reduceSubfunctions(satisfied)
+        return px
+
+    # The clause of the new sub-function i as masks of the choices packed in integers (the first choice is the most significant bit, as in evaluate_table).
+    # Returns (care, false): the clause is false for the packed choices b with b & care == false, or never if false is None (the clause has the literals x and not x).
+    # The literals of the common variables are false (see reduceSubfunctions) and, as in evaluate, if a variable appears more than once in the new sub-function, the last choice is the one used
+    def getFalseMasks(self, i):
+        s = self.sfsMappingInv[i]
+        n_sf = self.sfs[i]
+        n_bits = len(n_sf)
+
+        # the bit of the (last) choice of each new variable
+        bits = {}
+        for v in range(n_bits):
+            bits[n_sf[v]] = 1 << (n_bits-1-v)
+
+        care, false = 0, 0
+        start, end = self.instance.clausePtr[s], self.instance.clausePtr[s+1]
+        for var, sign in zip(self.instance.clauseVars[start:end].tolist(), self.instance.clauseSigns[start:end].tolist()):
+            if var not in self.varsMap:
+                continue
+            bit = bits[self.varsMap[var]]
+            choice = 1 ^ sign ^ int(self.p1[var]) # the choice that makes the literal false (the value of p1 if it makes the literal false, and the one of p2 otherwise)
+            if care & bit and bool(false & bit) != bool(choice):
+                return care, None
+            care |= bit
+            false |= bit*choice
+
+        return care, false
+
     """
     API Functions
     """
@@ -72,6 +130,10 @@ class PX:
     def subfunctions(self):
         return self.sfs
 
+    # The new sub-functions depend on the different variables and on the clauses kept (see reduceSubfunctions), so both identify the plans of the recombinations with the same sub-functions (see OptimalRecombination.PlanCache)
+    def structure_key(self):
+        return (self.diffVars.tobytes(), self.kept.tobytes())
+
     def evaluate(self, i, t):
 
         orig_sf = self.original_subfunctions[self.sfsMappingInv[i]]
@@ -100,23 +162,35 @@ class PX:
         new_t = tuple([map[v] for v in orig_sf]) # construct the new tuple with all the variables, considering the order they appear in the original sub-function
 
         # negate the objective value of the sub-function, because the implementation of the DPX assumes minimization
-        return -1*instance.instance.evaluate(self.sfsMappingInv[i], new_t)
+        return -1*self.instance.evaluate(self.sfsMappingInv[i], new_t)
+
+    # Returns the values of evaluate(i, t) for all the 2^len(t) tuples t, as an array where the value of t is in the position given by the integer represented by t (the first choice is the most significant bit).
+    # Each table is computed only once per recombination.
+    def evaluate_table(self, i):
+        if i not in self.tables:
+            self.tables[i] = self.computeTable(i)
+        return self.tables[i]
+
+    def computeTable(self, i):
+        # negate the objective value of the sub-function, because the implementation of the DPX assumes minimization
+        # the clause is evaluated for all the packed choices at once, with its masks (see getFalseMasks)
+        weight = self.instance.weights[self.sfsMappingInv[i]]
+        care, false = self.getFalseMasks(i)
+        if false is None:
+            return np.full(2**len(self.sfs[i]), -weight, dtype=np.int64)
+        return -weight*((np.arange(2**len(self.sfs[i]), dtype=np.int64) & care) != false)
 
     # construct the offsring given the choices in t (a tuple), where a value of 0 corresponds to self.p1 and 1 to self.p2
-    def offspring(self, t):
+    # The offspring is a copy of self.p1 where only the variables chosen from self.p2 are overwritten.
+    # If 'flipped' is True, only the array with the (original) variables where the offspring differs from self.p1 is returned
+    def offspring(self, t, flipped=False):
 
         # each index, i, in t represents the variable i, as it was sent to the algorithm in the sub-functions, according to varsMap
-        off = [-1]*len(self.p1)
-
-        for v in range(len(t)):
-            real_v = self.varsMapInv[v]
-            if(t[v] == 0):
-                off[real_v] = self.p1[real_v]
-            else:
-                off[real_v] = self.p2[real_v]
+        flips = self.diffVars[np.asarray(t, dtype=int) == 1]
+        if flipped:
+            return flips
 
-        # add the common values
-        for v in self.commonVars:
-            off[v] = self.p1[v]
+        off = self.p1.copy()
+        off[flips] = self.p2[flips]
 
         return off
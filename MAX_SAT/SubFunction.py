@@ -1,3 +1,5 @@
+import numpy as np
+
 
 class SubFunction:
 
@@ -11,17 +13,27 @@ class SubFunction:
         # The same positions in both 'variables' and 'sub_function' correspond to the same variable
         self.sub_function = tuple([abs(i)-1 for i in variables]) # the respective sub-function, with variables without the indication of negation -- the parameters of the sub-function
 
+        # The assignments of the variables are packed in integers, where the value of the first variable is the most significant bit (as in the tables of PX).
+        # The clause is only false for the assignment where every literal is false, self.falseMask, i.e., with 1 in the negated variables
+        self.falseMask = packAssignment([int(i < 0) for i in self.variables])
+
     # t is a tuple of choices for each variable. t is assumed to have the sabe order as in self.sub_function and variables
     def evaluate(self, t):
-        result = 0
+        return self.evaluatePacked(packAssignment(t))
 
-        for i in range(len(t)):
-            if(self.variables[i] < 0):
-                result = result or (t[i]+1)%2 # if the variable is negated, flip its value
-            else:
-                result = result or t[i]
+    # evaluate the assignment packed in an integer (see packAssignment), or all the packed assignments in a numpy array at once
+    def evaluatePacked(self, packed):
+        if isinstance(packed, np.ndarray):
+            return self.weigth*(packed != self.falseMask)
+        return self.weigth*int(packed != self.falseMask) # multiply the result of the sub-function by its weight (as a Python int, since 'packed' may have a small numpy type)
 
-        return self.weigth*result # multiply the result of the sub-function by its weight
+    # evaluate several tuples at once. 'values' is a 2d numpy array where each row is a tuple, with the same order as in evaluate
+    def evaluateArray(self, values):
+        if len(self.variables) <= MAX_PACKED_BITS:
+            return self.evaluatePacked(packAssignments(values))
+
+        positive = np.array([v > 0 for v in self.variables], dtype=int) # value that makes each literal true
+        return self.weigth*np.any(values == positive, axis=1)
 
     # returns the tuple corresponding to the sub-function
     def getTuple(self):
@@ -29,3 +41,18 @@ class SubFunction:
 
     def getNumberOfVariables(self):
         return len(self.variables)
+
+
+MAX_PACKED_BITS = 63 # largest number of variables whose assignments can be packed in an int64 numpy array
+
+# the binary tuple (or list) t as an integer, where t[0] is the most significant bit
+def packAssignment(t):
+    packed = 0
+    for value in t:
+        packed = (packed << 1) | int(value)
+    return packed
+
+# the rows of the 2d binary array 'values' (with at most MAX_PACKED_BITS columns) as an array of integers (see packAssignment)
+def packAssignments(values):
+    values = np.asarray(values, dtype=np.int64)
+    return values @ (np.int64(1) << np.arange(values.shape[1]-1, -1, -1, dtype=np.int64))
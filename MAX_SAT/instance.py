@@ -1,5 +1,9 @@
 # instance vai guardar a instância NK Landscape usada por PX e criada no main.py
 import MAXSAT as ms
-def init(inst_file):
+# If 'cache_dir' is given, the instance is loaded from its binary cache in that directory (see MAXSAT.cached)
+def init(inst_file, cache_dir=None):
     global instance
-    instance = ms.MAXSAT(inst_file)
+    if cache_dir is None:
+        instance = ms.MAXSAT(inst_file)
+    else:
+        instance = ms.MAXSAT.cached(inst_file, cache_dir)
@@ -11,23 +11,17 @@ from OptimalRecombination import recombine
 
 def evaluateOffpsring(off):
 
-    inst = instance.instance
-    sfs = inst.getSubFunctions()
-    obj = 0
-    for s in range(len(sfs)):
-        sf = sfs[s]
-        t = tuple([off[i] for i in sf])
-        obj += inst.evaluate(s, t)
-    return abs(obj)
+    # all the clauses are evaluated at once (see MAXSAT.evaluatePopulation)
+    return instance.instance.evaluateSolution(off)
 
 
 if __name__ == "__main__":
 
     if(len(sys.argv) < 2):
-        print("Usage: {0} <instance>".format(sys.argv[0]))
+        print("Usage: {0} <instance> [<cache directory>]".format(sys.argv[0]))
         exit(0)
 
-    instance.init(sys.argv[1])
+    instance.init(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
     inst = instance.instance
     n = inst.getNumberOfVariables()
 
@@ -36,6 +30,6 @@ if __name__ == "__main__":
     print("Parent 1: {0} ".format(p1))
     print("Parent 2: {0} ".format(p2))
     print("\nRecombining...")
-    dpx_off = recombine(p1, p2)
+    dpx_off, fitness = recombine(p1, p2, return_fitness=True, fitness1=evaluateOffpsring(p1))
     print("Offspring: {0}".format(dpx_off))
-    print("Objective Value: {0}".format(evaluateOffpsring(dpx_off)))
+    print("Objective Value: {0}".format(fitness))
@@ -5,19 +5,20 @@ Changes:
     - Added to each node of the clique tree the atributes to store the separator, residue, sub-functions, and id
     - Create the separator and residue sets for each node of the clique tree
     - Additionally, return the cliques (with data), the chordal graph, and the alpha
+    - The clique tree is read directly from the elimination ordering alpha (see native_junction_tree.cliques_from_ordering), instead of computing the maximum spanning tree of the graph of all pairs of cliques
 """
 r"""Function for computing a junction tree of a graph."""
 
 import networkx as nx
 from networkx.utils import not_implemented_for
-from networkx.algorithms import moral, complete_to_chordal_graph, chordal_graph_cliques
-from itertools import combinations
+from networkx.algorithms import moral, complete_to_chordal_graph
+import native_junction_tree as njt
 
 __all__ = ["junction_tree"]
 
 
-@not_implemented_for("multigraph", "MultiDiGraph")
-def junction_tree(G):
+@not_implemented_for("multigraph")
+def junction_tree(G, ordering="mcs"):
     r"""Returns a junction tree of a given graph.
 
     A junction tree (or clique tree) is constructed from a (un)directed graph G.
@@ -31,20 +32,28 @@ def junction_tree(G):
     Junction Trees are not unique as the order of clique consideration determines
     which sepsets are included.
 
-    The junction tree algorithm consists of five steps [1]_:
+    The junction tree algorithm consists of four steps [1]_:
 
     1. Moralize the graph
     2. Triangulate the graph
-    3. Find maximal cliques
-    4. Build the tree from cliques, connecting cliques with shared
-       nodes, set edge-weight to number of shared variables
-    5. Find maximum spanning tree
+    3. Find maximal cliques from the perfect elimination ordering
+       of the triangulated graph
+    4. Connect each clique to the clique that contains the
+       neighbours of its first eliminated node that are eliminated
+       after it [3]_
+
+    Steps 3 and 4 take time linear in the size of the triangulated
+    graph, instead of being quadratic in the number of cliques.
 
 
     Parameters
     ----------
     G : networkx.Graph
         Directed or undirected graph.
+    ordering : string
+        The elimination ordering used to triangulate the graph: "mcs"
+        (networkx's complete_to_chordal_graph), "min-fill",
+        "min-degree" or "auto" (see native_junction_tree.triangulate).
 
     Returns
     -------
@@ -65,29 +74,33 @@ def junction_tree(G):
        junction trees. In Proceedings of the Tenth international
        conference on Uncertainty in artificial intelligence (UAI’94).
        Morgan Kaufmann Publishers Inc., San Francisco, CA, USA, 360–366.
+
+    .. [3] J. Blair and B. Peyton. 1993. An Introduction to Chordal
+       Graphs and Clique Trees. In Graph Theory and Sparse Matrix
+       Computation, pages 1–29. Springer.
     """
 
-    clique_graph = nx.Graph()
+    junction_tree = nx.Graph()
 
     if G.is_directed():
         G = moral.moral_graph(G)
-    chordal_graph, alpha = complete_to_chordal_graph(G)
-
-    # Change: sort elements in the tuple by MCS order
-    cliques = [tuple(sorted(i, key=lambda x: alpha[x])) for i in chordal_graph_cliques(chordal_graph)]
-    cliques.sort(key=len, reverse=True)
-
-
-    clique_graph.add_nodes_from(cliques, type="clique")
-
-    for edge in combinations(cliques, 2):
-        set_edge_0 = set(edge[0])
-        set_edge_1 = set(edge[1])
-        if not set_edge_0.isdisjoint(set_edge_1):
-            sepset = tuple(sorted(set_edge_0.intersection(set_edge_1)))
-            clique_graph.add_edge(edge[0], edge[1], weight=len(sepset), sepset=sepset)
-
-    junction_tree = nx.maximum_spanning_tree(clique_graph)
+    if ordering == "mcs":
+        chordal_graph, alpha = complete_to_chordal_graph(G)
+
+        # networkx returns alpha = 0 for all the nodes if G is already chordal. In that case, the MCS-M ordering of the chordal graph (without fill-in) is a perfect elimination ordering
+        if len(alpha) > 0 and max(alpha.values()) == 0:
+            _, alpha = njt.complete_to_chordal_graph(chordal_graph)
+        cliques, parents = njt.cliques_from_ordering(chordal_graph, alpha)
+    else:
+        chordal_graph, alpha, cliques, parents = njt.triangulate_cliques(G, ordering)
+
+    # the cliques are added from the largest to the smallest, so that the dfs below starts from the largest clique
+    junction_tree.add_nodes_from(sorted(cliques, key=len, reverse=True), type="clique")
+
+    for c in range(len(cliques)):
+        if parents[c] >= 0:
+            sepset = tuple(sorted(set(cliques[c]).intersection(cliques[parents[c]])))
+            junction_tree.add_edge(cliques[c], cliques[parents[c]], weight=len(sepset), sepset=sepset)
 
     """
     Changes
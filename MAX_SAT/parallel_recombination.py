@@ -0,0 +1,239 @@
+"""
+Recombination of many pairs of parents in a pool of processes.
+The cost of the recombinations in a generation can differ by several orders of magnitude, so the pairs are sent to the pool
+in longest-processing-time-first (LPT) order, according to Recombiner.estimate_cost, one pair at a time.
+This way, the most expensive recombinations start first and the cheap ones fill the idle processes at the end.
+"""
+
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+
+__all__ = ["lptOrder", "recombine_pairs", "SharedArrays", "SharedRecombinationPool", "recombine_shared"]
+
+
+_recombiner = None # the Recombiner of each worker process
+_recombine_kwargs = {}
+
+def _initWorker(recombiner, recombine_kwargs):
+    global _recombiner, _recombine_kwargs
+    _recombiner = recombiner
+    _recombine_kwargs = recombine_kwargs
+
+def _recombineWorker(job):
+    ix, p1, p2 = job
+    return ix, _recombiner.recombine(p1, p2, **_recombine_kwargs)
+
+
+# indices of the pairs ordered from the most to the least expensive, where 'costs' are the tuples returned by Recombiner.estimate_cost
+def lptOrder(costs):
+    return sorted(range(len(costs)), key=lambda i: costs[i][2], reverse=True)
+
+"""
+Recombine all the pairs (p1, p2) in 'pairs' and return the results of Recombiner.recombine, in the same order as the pairs.
+'recombiner' is the Recombiner used by all processes, and 'recombine_kwargs' are the arguments (e.g., beta or the budgets) passed to each call to recombine.
+'processes' is the number of processes (by default, the number of cores). With 1 process, the pairs are recombined in this process, in LPT order.
+The processes are created with fork, where available, so the instance does not need to be pickled, and the processes start with the plans created by estimate_cost (see Recombiner.getPlan) in the cache of the recombiner.
+"""
+def recombine_pairs(recombiner, pairs, processes=None, recombine_kwargs=None):
+    recombine_kwargs = {} if recombine_kwargs is None else recombine_kwargs
+    order = lptOrder([recombiner.estimate_cost(p1, p2) for p1, p2 in pairs])
+    results = [None]*len(pairs)
+
+    if processes == 1:
+        for ix in order:
+            results[ix] = recombiner.recombine(pairs[ix][0], pairs[ix][1], **recombine_kwargs)
+        return results
+
+    if "fork" in mp.get_all_start_methods():
+        ctx = mp.get_context("fork")
+    else:
+        ctx = mp.get_context()
+
+    with ctx.Pool(processes, initializer=_initWorker, initargs=(recombiner, recombine_kwargs)) as pool:
+        # chunksize=1: each process asks for a new pair as soon as it finishes the previous one
+        for ix, off in pool.imap_unordered(_recombineWorker, [(ix, pairs[ix][0], pairs[ix][1]) for ix in order], chunksize=1):
+            results[ix] = off
+
+    return results
+
+
+"""
+Numpy arrays stored in one block of shared memory.
+The process that creates the block (with 'arrays', a dictionary of arrays) owns it and must call unlink when it is no longer needed.
+The other processes attach to it with the picklable 'spec' (the name of the block and the layout of the arrays): the arrays they get are views of the shared memory, without copies.
+"""
+class SharedArrays:
+
+    ALIGNMENT = 64 # each array starts at a multiple of ALIGNMENT bytes
+
+    def __init__(self, arrays=None, spec=None):
+        if spec is None:
+            layout, size = {}, 0
+            for key, a in arrays.items():
+                a = np.ascontiguousarray(a)
+                layout[key] = (a.dtype.str, a.shape, size)
+                size += -(-max(a.nbytes, 1)//self.ALIGNMENT)*self.ALIGNMENT
+            self.shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+            self.spec = (self.shm.name, layout)
+            self.arrays = self.views()
+            for key, a in arrays.items():
+                self.arrays[key][...] = a
+        else:
+            self.shm = shared_memory.SharedMemory(name=spec[0])
+            self.spec = spec
+            self.arrays = self.views()
+
+    def views(self):
+        return {key: np.ndarray(shape, dtype=np.dtype(dtype), buffer=self.shm.buf, offset=offset) for key, (dtype, shape, offset) in self.spec[1].items()}
+
+    def __getitem__(self, key):
+        return self.arrays[key]
+
+    def close(self):
+        self.arrays = None
+        self.shm.close()
+
+    def unlink(self):
+        self.close()
+        self.shm.unlink()
+
+
+_shared_instance = None # the SharedArrays of each worker process
+_shared_buffers = None
+SHARED_RECOMBINE_ARGS = ["flipped", "return_fitness", "fitness1"] # arguments of recombine given by _recombineSharedWorker, which cannot be in 'recombine_kwargs'
+
+# 'plans' are the plans already created by the Recombiner of the main process (see PlanCache.items), which are put in the cache of the worker
+def _initSharedWorker(instance_class, instance_spec, buffers_spec, recombiner_options, recombine_kwargs, plans):
+    global _shared_instance, _shared_buffers, _recombiner, _recombine_kwargs
+    from OptimalRecombination import Recombiner
+
+    _shared_instance = SharedArrays(spec=instance_spec)
+    _shared_buffers = SharedArrays(spec=buffers_spec)
+    _recombiner = Recombiner(instance_class.fromArrays(_shared_instance.arrays), **recombiner_options)
+    _recombine_kwargs = recombine_kwargs
+    if _recombiner.cache is not None:
+        for key, plan in plans:
+            _recombiner.cache.put(key, plan)
+
+# 'job' is the index of the pair in the shared buffers and whether the fitness of its first parent is given
+def _recombineSharedWorker(job):
+    ix, use_fitness1 = job
+    P1, P2 = _shared_buffers["P1"], _shared_buffers["P2"]
+    fitness1 = _shared_buffers["fitness1"][ix] if use_fitness1 else None
+
+    result = _recombiner.recombine(P1[ix], P2[ix], return_fitness=True, fitness1=fitness1, **_recombine_kwargs)
+    _shared_buffers["offspring"][ix] = result[0]
+    _shared_buffers["fitness"][ix] = result[-1]
+    return ix
+
+# the arguments of the constructor of a Recombiner equal to 'recombiner'
+def getRecombinerOptions(recombiner):
+    return {
+        "vectorized": recombiner.vectorized,
+        "backend": recombiner.backend,
+        "ordering": recombiner.ordering,
+        "fallback": recombiner.fallback,
+        "workers": recombiner.workers,
+        "parallel_cells": recombiner.parallel_cells,
+        "trivial_size": recombiner.trivial_size,
+        "cache_size": 0 if recombiner.cache is None else recombiner.cache.maxsize,
+    }
+
+"""
+Pool of processes that recombine pairs of parents with the instance in shared memory, created once and used for many batches of pairs (e.g., all the generations of a genetic algorithm).
+The instance of 'recombiner' is stored once in shared memory, as the flat arrays returned by its toArrays method, and each process creates its own instance from them (with fromArrays), without copying them.
+The parents, the fitnesses of the first parents, and the offspring and their fitnesses are also in shared memory, in buffers with room for 'shape' = (pairs, variables) parents of type 'dtype', so only the indices of the pairs are sent to the processes.
+The processes start with the plans in the cache of 'recombiner' (see PlanCache.items).
+'start_method' is the start method of the processes (by default, the default of multiprocessing). With "spawn", the modules of the problem must be importable by the processes.
+'recombine_kwargs' are passed to each call to recombine, and cannot contain the arguments in SHARED_RECOMBINE_ARGS, since the offspring are always complete and returned with their fitnesses.
+The pool must be closed (with close, or used in a with statement) to release the processes and the shared memory.
+"""
+class SharedRecombinationPool:
+
+    def __init__(self, recombiner, shape, dtype=np.int8, processes=None, recombine_kwargs=None, start_method=None):
+        recombine_kwargs = {} if recombine_kwargs is None else recombine_kwargs
+        reserved = [key for key in SHARED_RECOMBINE_ARGS if key in recombine_kwargs]
+        if len(reserved) > 0:
+            raise ValueError("recombine_kwargs cannot contain {0}: they are given by the pool".format(", ".join(reserved)))
+
+        self.recombiner = recombiner
+        self.shape = tuple(shape)
+        self.shared_instance = SharedArrays(recombiner.instance.toArrays())
+        self.shared_buffers = None
+        self.pool = None
+        try:
+            self.shared_buffers = SharedArrays({
+                "P1": np.zeros(self.shape, dtype=dtype),
+                "P2": np.zeros(self.shape, dtype=dtype),
+                "offspring": np.zeros(self.shape, dtype=dtype),
+                "fitness1": np.zeros(self.shape[0]),
+                "fitness": np.zeros(self.shape[0]),
+            })
+            ctx = mp.get_context(start_method)
+            plans = [] if recombiner.cache is None else recombiner.cache.items()
+            initargs = (type(recombiner.instance), self.shared_instance.spec, self.shared_buffers.spec, getRecombinerOptions(recombiner), recombine_kwargs, plans)
+            self.pool = ctx.Pool(processes, initializer=_initSharedWorker, initargs=initargs)
+        except BaseException:
+            self.close()
+            raise
+
+    """
+    Recombine the pairs of parents in the rows of the 2d arrays P1 and P2 (with at most shape[0] rows), in longest-processing-time-first order (see lptOrder).
+    'order' is the order of the pairs, computed with Recombiner.estimate_cost if it is not given.
+    Returns the offspring, in a 2d array with the same shape of P1, and an array with their fitnesses.
+    """
+    def recombine(self, P1, P2, fitness1=None, order=None):
+        P1, P2 = np.asarray(P1), np.asarray(P2)
+        if P1.shape != P2.shape or P1.ndim != 2:
+            raise ValueError("P1 and P2 must be 2d arrays with the same shape")
+        if len(P1) > self.shape[0] or P1.shape[1] != self.shape[1]:
+            raise ValueError("The pool has room for {0} pairs of {1} variables".format(*self.shape))
+
+        B = len(P1)
+        self.shared_buffers["P1"][:B] = P1
+        self.shared_buffers["P2"][:B] = P2
+        if fitness1 is not None:
+            self.shared_buffers["fitness1"][:B] = fitness1
+
+        if order is None:
+            order = lptOrder([self.recombiner.estimate_cost(P1[ix], P2[ix]) for ix in range(B)])
+        for _ in self.pool.imap_unordered(_recombineSharedWorker, [(ix, fitness1 is not None) for ix in order], chunksize=1):
+            pass
+
+        return self.shared_buffers["offspring"][:B].astype(P1.dtype), self.shared_buffers["fitness"][:B].copy()
+
+    # stop the processes and release the shared memory
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+        if self.shared_buffers is not None:
+            self.shared_buffers.unlink()
+            self.shared_buffers = None
+        if self.shared_instance is not None:
+            self.shared_instance.unlink()
+            self.shared_instance = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+"""
+Recombine the pairs of parents in the rows of the 2d arrays P1 and P2 in a pool of processes, as recombine_pairs, with the instance in shared memory (see SharedRecombinationPool).
+The fitnesses of P1 ('fitness1') are optional, see Recombiner.recombine.
+Returns the offspring, in a 2d array with the same shape of P1, and an array with their fitnesses.
+The processes are only used for this batch: to recombine many batches, a SharedRecombinationPool avoids creating the processes and the shared memory for each of them.
+"""
+def recombine_shared(recombiner, P1, P2, fitness1=None, processes=None, recombine_kwargs=None, start_method=None):
+    P1, P2 = np.asarray(P1), np.asarray(P2)
+    if P1.shape != P2.shape or P1.ndim != 2:
+        raise ValueError("P1 and P2 must be 2d arrays with the same shape")
+
+    # the plans created by estimate_cost are given to the processes, so they do not create them again
+    order = lptOrder([recombiner.estimate_cost(P1[ix], P2[ix]) for ix in range(len(P1))])
+    with SharedRecombinationPool(recombiner, P1.shape, P1.dtype, processes, recombine_kwargs, start_method) as pool:
+        return pool.recombine(P1, P2, fitness1, order)
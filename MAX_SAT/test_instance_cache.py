@@ -0,0 +1,127 @@
+"""
+Tests of the binary files of the instances (instance_cache.py) and of the conversion of MAXSAT instances to and from flat arrays.
+Run with pytest from this directory.
+"""
+
+import os
+import numpy as np
+import pytest
+import MAXSAT
+from instance_cache import saveArrays, loadArrays, cachedArrays, readMetadata
+
+INSTANCE = "p wcnf 5 4 100\n3 1 -2 0\n100 -1 3 4 0\n5 2 -5 0\n7 -3 0\n"
+
+
+@pytest.fixture
+def arrays():
+    return {"a": np.arange(10, dtype=np.int64), "b": np.array([[1, 0], [0, 1]], dtype=np.uint8)}
+
+# builder of the arrays that counts the calls
+class Builder:
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.arrays
+
+def cacheDirectories(path):
+    return [d for d in os.listdir(path) if d.endswith(".cache")]
+
+
+def test_save_load(tmp_path, arrays):
+    saveArrays(str(tmp_path / "arrays"), arrays, {"name": "test"})
+    loaded, metadata = loadArrays(str(tmp_path / "arrays"))
+
+    assert metadata["name"] == "test"
+    assert sorted(loaded) == sorted(arrays)
+    for key, a in arrays.items():
+        assert isinstance(loaded[key], np.memmap)
+        assert not loaded[key].flags.writeable
+        assert np.array_equal(loaded[key], a) and loaded[key].dtype == a.dtype
+
+    # saving again replaces the directory
+    saveArrays(str(tmp_path / "arrays"), {"c": np.ones(3)})
+    assert sorted(loadArrays(str(tmp_path / "arrays"))[0]) == ["c"]
+
+def test_load_unsupported_format(tmp_path, arrays):
+    saveArrays(str(tmp_path / "arrays"), arrays)
+    (tmp_path / "arrays" / "metadata.json").write_text('{"format": 0, "arrays": []}')
+    with pytest.raises(ValueError):
+        loadArrays(str(tmp_path / "arrays"))
+
+def test_cache_hit(tmp_path, arrays):
+    source = tmp_path / "instance.txt"
+    source.write_text("instance")
+    build = Builder(arrays)
+
+    first = cachedArrays(str(source), build)
+    second = cachedArrays(str(source), build)
+    assert build.calls == 1
+    assert np.array_equal(first["a"], second["a"])
+    assert len(cacheDirectories(tmp_path)) == 1
+
+def test_cache_dir(tmp_path, arrays):
+    source = tmp_path / "instance.txt"
+    source.write_text("instance")
+    cachedArrays(str(source), Builder(arrays), str(tmp_path / "cache"))
+    assert len(cacheDirectories(tmp_path)) == 0
+    assert len(cacheDirectories(tmp_path / "cache")) == 1
+
+def test_cache_rebuilt_when_source_changes(tmp_path, arrays):
+    source = tmp_path / "instance.txt"
+    source.write_text("instance")
+    build = Builder(arrays)
+    cachedArrays(str(source), build)
+
+    source.write_text("another instance")
+    build.arrays = {"a": np.arange(3)}
+    assert np.array_equal(cachedArrays(str(source), build)["a"], np.arange(3))
+    assert build.calls == 2
+
+# same size and modification time, but different contents: the cache is only rebuilt when the hash is checked, after the stat changes
+def test_cache_rebuilt_when_hash_changes(tmp_path, arrays):
+    source = tmp_path / "instance.txt"
+    source.write_text("instance")
+    build = Builder(arrays)
+    cachedArrays(str(source), build)
+    stat = os.stat(source)
+
+    source.write_text("INSTANCE")
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    build.arrays = {"a": np.arange(3)}
+    assert np.array_equal(cachedArrays(str(source), build)["a"], np.arange(3))
+    assert build.calls == 2
+
+def test_cache_touched_source(tmp_path, arrays):
+    source = tmp_path / "instance.txt"
+    source.write_text("instance")
+    build = Builder(arrays)
+    cachedArrays(str(source), build)
+    directory = str(tmp_path / cacheDirectories(tmp_path)[0])
+    stat = os.stat(source)
+
+    # same contents with a new modification time: only the metadata is updated
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    cachedArrays(str(source), build)
+    assert build.calls == 1
+    assert readMetadata(directory)["mtime_ns"] == stat.st_mtime_ns + 10**9
+
+def test_maxsat_arrays(tmp_path):
+    path = tmp_path / "instance.wcnf"
+    path.write_text(INSTANCE)
+    inst = MAXSAT.MAXSAT(str(path))
+
+    for copy in [MAXSAT.MAXSAT.fromArrays(inst.toArrays()), saveLoad(inst, tmp_path / "saved"), MAXSAT.MAXSAT.cached(str(path))]:
+        assert (copy.nvar, copy.nclauses, copy.top) == (inst.nvar, inst.nclauses, inst.top)
+        assert list(copy.getSubFunctions()) == list(inst.getSubFunctions())
+        for key in ["clauseSigns", "weights", "hard"]:
+            assert np.array_equal(getattr(copy, key), getattr(inst, key))
+
+        X = np.random.default_rng(0).integers(0, 2, (20, inst.nvar))
+        assert np.array_equal(copy.evaluatePopulation(X), inst.evaluatePopulation(X))
+
+def saveLoad(inst, directory):
+    inst.save(str(directory))
+    return MAXSAT.MAXSAT.load(str(directory))
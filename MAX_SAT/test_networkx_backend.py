@@ -0,0 +1,100 @@
+"""
+Tests of the recombination with the "networkx" backend of the Graph class, compared with the "native" backend.
+Run with pytest from this directory.
+"""
+
+import numpy as np
+import pytest
+import MAXSAT
+from OptimalRecombination import Recombiner, RecombinationBudgetExceeded, createRecombinationGraph, boundCliqueSize, getDPCost
+from PX import PX
+
+pytest.importorskip("networkx")
+
+BACKENDS = ["native", "networkx"]
+
+
+# random 3-SAT instance with 30 variables and 120 clauses, in the format up to 2021
+@pytest.fixture(scope="module")
+def inst(tmp_path_factory):
+    rng = np.random.default_rng(0)
+    n, m = 30, 120
+    lines = ["p wcnf {0} {1} 1000".format(n, m)]
+    for _ in range(m):
+        variables = rng.choice(n, 3, replace=False) + 1
+        signs = rng.choice([-1, 1], 3)
+        lines.append("{0} {1} 0".format(rng.integers(1, 10), " ".join(str(v) for v in variables*signs)))
+
+    path = tmp_path_factory.mktemp("instances") / "random.wcnf"
+    path.write_text("\n".join(lines) + "\n")
+    return MAXSAT.MAXSAT(str(path))
+
+@pytest.fixture(scope="module")
+def parents(inst):
+    rng = np.random.default_rng(1)
+    n = inst.getNumberOfVariables()
+    return rng.integers(0, 2, n), rng.integers(0, 2, n)
+
+
+def test_cliques_are_tuples(inst, parents):
+    sf = PX(*parents, inst).subfunctions()
+    native = createRecombinationGraph(sf, "native").getCliques()
+    networkx = createRecombinationGraph(sf, "networkx").getCliques()
+    assert all(isinstance(c, tuple) for c in networkx)
+    assert sorted(map(sorted, native)) == sorted(map(sorted, networkx))
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_beta_is_honoured(inst, parents, backend):
+    px = PX(*parents, inst)
+    sf = px.subfunctions()
+    rec_graph = createRecombinationGraph(sf, backend)
+    assert max(len(c) for c in rec_graph.getCliques()) > 2
+
+    _, _, bounded_graph, optimal = boundCliqueSize(px, sf, rec_graph, 2, backend)
+    assert not optimal
+    assert max(len(c) for c in bounded_graph.getCliques()) <= 2
+
+    off, optimal = Recombiner(inst, backend=backend).recombine(*parents, beta=2)
+    assert not optimal
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_budgets(inst, parents, backend):
+    recombiner = Recombiner(inst, backend=backend)
+    sf = PX(*parents, inst).subfunctions()
+    cells = getDPCost(createRecombinationGraph(sf, backend), sf)[0]
+
+    off, optimal = recombiner.recombine(*parents, max_cells=cells, max_bytes=2**30, deadline=60)
+    assert optimal
+    assert np.array_equal(off, recombiner.recombine(*parents))
+
+    with pytest.raises(RecombinationBudgetExceeded):
+        recombiner.recombine(*parents, max_cells=cells-1)
+
+    off, optimal = recombiner.recombine(*parents, max_cells=cells-1, fallback="bounded")
+    assert not optimal
+    off, optimal = recombiner.recombine(*parents, max_cells=1, fallback="parent")
+    assert not optimal
+    assert np.array_equal(off, parents[0]) or np.array_equal(off, parents[1])
+
+def test_estimate_cost(inst, parents):
+    costs = []
+    for backend in BACKENDS:
+        recombiner = Recombiner(inst, backend=backend)
+        costs.append(recombiner.estimate_cost(*parents))
+
+        # the plan created by the estimate is used by the recombination
+        recombiner.recombine(*parents)
+        assert recombiner.cache_info()["hits"] == 1
+    assert costs[0] == costs[1]
+
+# instance with two independent groups of 3 variables, so the recombination of complementary parents has two components solved by the threads
+def test_parallel_components(tmp_path):
+    path = tmp_path / "components.wcnf"
+    path.write_text("p wcnf 6 6 100\n1 1 2 3 0\n2 -1 -2 0\n3 2 -3 0\n1 4 5 6 0\n2 -4 -5 0\n3 5 -6 0\n")
+    inst = MAXSAT.MAXSAT(str(path))
+    p1, p2 = np.zeros(6, dtype=int), np.ones(6, dtype=int)
+
+    expected = Recombiner(inst).recombine(p1, p2)
+    recombiner = Recombiner(inst, backend="networkx", workers=4, parallel_cells=0)
+    assert len(recombiner.getPlan(PX(p1, p2, inst), PX(p1, p2, inst).subfunctions())[1]) == 2
+    assert np.array_equal(recombiner.recombine(p1, p2), expected)
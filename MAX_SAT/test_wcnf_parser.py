@@ -0,0 +1,113 @@
+"""
+Tests of the streaming WCNF parser (wcnf_parser.readWCNF), compared with a line by line reader like the one used before by MAXSAT.
+Run with pytest from this directory.
+"""
+
+import bz2
+import gzip
+import lzma
+import numpy as np
+import pytest
+from wcnf_parser import readWCNF
+
+OLD_FORMAT = """c weighted instance in the format up to 2021
+p wcnf 6 5 100
+10 1 -2 3 0
+c a comment between clauses
+100 -1 4 0
+3 2 -5 6 0
+100 -3 -6 0
+7 5 0
+"""
+
+NEW_FORMAT = """c weighted instance in the format from 2022
+h 1 -2 3 0
+4 -1 4 0
+c a comment between clauses
+h 2 -5 6 0
+3 -3 -6 0
+7 5 0
+"""
+
+
+# line by line reader: returns the weights (None for the hard clauses of the 2022 format) and the literals of each clause, and the header
+def readLines(text):
+    header, clauses = None, []
+    for line in text.splitlines():
+        line = line.split()
+        if len(line) == 0 or line[0] == "c":
+            continue
+        if line[0] == "p":
+            header = line
+            continue
+        assert line[-1] == "0"
+        w = None if line[0] == "h" else int(line[0])
+        clauses.append((w, [int(l) for l in line[1:-1]])) # exclude the weight and the 'stop sign' 0
+    return header, clauses
+
+def check(inst, text):
+    header, clauses = readLines(text)
+    weights = [w for w, _ in clauses]
+    top = sum(w for w in weights if w is not None) + 1 if header is None else (int(header[4]) if len(header) > 4 else None)
+
+    assert inst["nclauses"] == len(clauses)
+    assert inst["top"] == top
+    assert inst["weights"].tolist() == [top if w is None else w for w in weights]
+    assert inst["hard"].tolist() == [w is None or (top is not None and w >= top) for w in weights]
+
+    ptr = inst["clause_ptr"]
+    for i, (_, literals) in enumerate(clauses):
+        variables = inst["clause_vars"][ptr[i]:ptr[i+1]]
+        signs = inst["clause_signs"][ptr[i]:ptr[i+1]]
+        assert [int(v+1) if s else -int(v+1) for v, s in zip(variables, signs)] == literals
+
+    nvar = max(abs(l) for _, literals in clauses for l in literals)
+    assert inst["nvar"] == (max(nvar, int(header[2])) if header is not None else nvar)
+
+def write(tmp_path, text, name="instance.wcnf", compress=open):
+    path = tmp_path / name
+    with compress(str(path), "wb") as f:
+        f.write(text.encode())
+    return str(path)
+
+
+@pytest.mark.parametrize("text", [OLD_FORMAT, OLD_FORMAT.replace("p wcnf 6 5 100", "p wcnf 8 5"), NEW_FORMAT], ids=["old", "old-without-top", "new"])
+def test_formats(tmp_path, text):
+    check(readWCNF(write(tmp_path, text)), text)
+
+@pytest.mark.parametrize("compress", [gzip.open, lzma.open, bz2.open], ids=["gz", "xz", "bz2"])
+def test_compressed(tmp_path, compress):
+    path = write(tmp_path, NEW_FORMAT, "instance.wcnf.compressed", compress)
+    check(readWCNF(path), NEW_FORMAT)
+
+@pytest.mark.parametrize("block_size", [1, 7, 16, 64])
+def test_clauses_across_blocks(tmp_path, block_size):
+    rng = np.random.default_rng(0)
+    lines = ["p wcnf 50 200 1000"]
+    for _ in range(200):
+        k = rng.integers(1, 8)
+        literals = (rng.choice(50, k, replace=False) + 1) * rng.choice([-1, 1], k)
+        lines.append("{0} {1} 0".format(rng.integers(1, 2000), " ".join(map(str, literals))))
+    text = "\n".join(lines) + "\n"
+
+    path = write(tmp_path, text)
+    check(readWCNF(path, block_size), text)
+    assert np.array_equal(readWCNF(path, block_size)["clause_vars"], readWCNF(path)["clause_vars"])
+
+@pytest.mark.parametrize("block_size", [5, 1 << 24])
+def test_zero_weights(tmp_path, block_size):
+    text = "p wcnf 4 4 10\n0 1 -2 0\n3 2 0\n0 -3 4 0\n0 1 0\n"
+    check(readWCNF(write(tmp_path, text), block_size), text)
+
+def test_missing_trailing_newline(tmp_path):
+    text = NEW_FORMAT.rstrip("\n")
+    check(readWCNF(write(tmp_path, text), 8), text)
+
+@pytest.mark.parametrize("text", [
+    "p cnf 3 2\n1 -2 0\n2 3 0\n", # unsupported format
+    "p wcnf 3 2 10\n1 -2 x 0\n2 3 0\n", # invalid token
+    "p wcnf 3 2 10\n1 -2 0\n2 3\n", # the last clause does not end with 0
+], ids=["cnf-header", "invalid-token", "missing-zero"])
+def test_malformed(tmp_path, text):
+    with pytest.raises(ValueError):
+        readWCNF(write(tmp_path, text))
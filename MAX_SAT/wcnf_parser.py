@@ -0,0 +1,156 @@
+"""
+Streaming parser of weighted MaxSAT instances (WCNF), in the formats of https://maxsat-evaluations.github.io:
+    - the format up to 2021, with the header "p wcnf <variables> <clauses> [<top>]", where the clauses with weight (at least) top are hard
+    - the format from 2022, without header, where the hard clauses have "h" instead of the weight
+The files may be compressed with gzip, xz or bz2 (detected from their first bytes), and the comment lines (starting with "c") may be anywhere.
+The file is read in blocks of 'block_size' bytes, and the numbers of each block are converted all at once by numpy, directly into the CSR arrays used by MAXSAT (see MAXSAT.py).
+"""
+
+import bz2
+import gzip
+import lzma
+import re
+import warnings
+import numpy as np
+
+__all__ = ["openWCNF", "readWCNF"]
+
+COMMENT = re.compile(rb"^[ \t]*c.*$", re.M)
+HEADER = re.compile(rb"^[ \t]*p[ \t]+(\S+)[ \t]+(\d+)[ \t]+(\d+)(?:[ \t]+(\d+))?[ \t]*$", re.M)
+HARD = re.compile(rb"^([ \t]*)h(?=\s)", re.M)
+HARD_WEIGHT = -1 # weight given to the hard clauses of the 2022 format while reading, since the weights are never negative
+
+# open the instance file, decompressing it if it is compressed with gzip, xz or bz2
+def openWCNF(path):
+    with open(path, "rb") as f:
+        magic = f.read(6)
+
+    if magic[:2] == b"\x1f\x8b":
+        return gzip.open(path, "rb")
+    if magic == b"\xfd7zXZ\x00":
+        return lzma.open(path, "rb")
+    if magic[:3] == b"BZh":
+        return bz2.open(path, "rb")
+    return open(path, "rb")
+
+# the numbers in 'text' (bytes with only numbers and whitespace), as an int64 array
+def tokenize(text):
+    if len(text) == 0 or text.isspace(): # np.fromstring returns [0] for a string with only whitespace
+        return np.zeros(0, dtype=np.int64)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", DeprecationWarning) # numpy warns, instead of failing, when it stops at an invalid token
+        try:
+            return np.fromstring(text.decode("ascii"), dtype=np.int64, sep=" ")
+        except (DeprecationWarning, ValueError, UnicodeDecodeError):
+            raise ValueError("Invalid token in the instance file")
+
+"""
+Split the sequence of numbers 'tokens' into clauses "<weight> <literals> 0".
+Returns the weights, the number of literals of each clause and the literals of all the complete clauses, and the tokens of the last clause, if it is not complete.
+"""
+def splitClauses(tokens):
+    ends = np.flatnonzero(tokens == 0)
+    if len(ends) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), tokens
+
+    starts = np.concatenate([[0], ends[:-1]+1]).astype(np.int64)
+
+    # the weight of a clause is 0 (so, one of the ends found is a weight): the clauses are found one by one
+    if np.any(starts == ends):
+        return splitClausesSequentially(tokens, ends)
+
+    last = ends[-1]+1
+    is_literal = np.ones(last, dtype=bool)
+    is_literal[starts] = False
+    is_literal[ends] = False
+    return tokens[starts], ends - starts - 1, tokens[:last][is_literal], tokens[last:]
+
+def splitClausesSequentially(tokens, ends):
+    weights, lens, literals = [], [], []
+    start = 0
+    while start < len(tokens):
+        e = np.searchsorted(ends, start+1) # the first end after the weight
+        if e == len(ends):
+            break
+        end = ends[e]
+        weights.append(tokens[start])
+        lens.append(end - start - 1)
+        literals.append(tokens[start+1:end])
+        start = end+1
+
+    literals = np.concatenate(literals) if len(literals) > 0 else np.zeros(0, dtype=np.int64)
+    return np.array(weights, dtype=np.int64), np.array(lens, dtype=np.int64), literals, tokens[start:]
+
+"""
+Read the instance in 'path'. Returns a dictionary with:
+    - "nvar", "nclauses": the number of variables and clauses (the number of variables is the one in the header, if there is one and it is larger than the largest variable)
+    - "clause_ptr", "clause_vars", "clause_signs", "weights": the CSR arrays of the clauses (see MAXSAT)
+    - "hard": a boolean array with the hard clauses
+    - "top": the weight of the hard clauses (the one in the header or, in the 2022 format, the sum of the weights of the soft clauses plus 1)
+"""
+def readWCNF(path, block_size=1 << 24):
+    header = None
+    weights, lens, literals = [], [], []
+    pending = np.zeros(0, dtype=np.int64) # tokens of a clause that continues in the next block
+    carry = b"" # the last line of a block, which may continue in the next block
+
+    with openWCNF(path) as f:
+        while True:
+            data = f.read(block_size)
+            if data:
+                text = carry + data
+                cut = text.rfind(b"\n") + 1
+                text, carry = text[:cut], text[cut:]
+                if cut == 0:
+                    continue
+            else:
+                text, carry = carry, b""
+
+            text = COMMENT.sub(b"", text)
+            if header is None:
+                match = HEADER.search(text)
+                if match is not None:
+                    if match.group(1) != b"wcnf":
+                        raise ValueError("Unsupported format: {0}".format(match.group(1).decode()))
+                    header = match
+                    text = text[:match.start()] + text[match.end():]
+            text = HARD.sub(rb"\g<1>" + str(HARD_WEIGHT).encode(), text)
+
+            block_weights, block_lens, block_literals, pending = splitClauses(np.concatenate([pending, tokenize(text)]))
+            weights.append(block_weights)
+            lens.append(block_lens)
+            literals.append(block_literals)
+
+            if not data:
+                break
+
+    if len(pending) > 0:
+        raise ValueError("The last clause of the instance file does not end with 0")
+
+    weights = np.concatenate(weights)
+    literals = np.concatenate(literals)
+    clause_ptr = np.zeros(len(weights)+1, dtype=np.int64)
+    np.cumsum(np.concatenate(lens), out=clause_ptr[1:])
+    clause_vars = np.abs(literals) - 1
+    nvar = int(clause_vars.max())+1 if len(clause_vars) > 0 else 0
+
+    if header is not None:
+        nvar = max(nvar, int(header.group(2)))
+        top = int(header.group(4)) if header.group(4) is not None else None
+        hard = weights >= top if top is not None else np.zeros(len(weights), dtype=bool)
+    else:
+        hard = weights == HARD_WEIGHT
+        top = int(weights[~hard].sum()) + 1
+        weights[hard] = top
+
+    return {
+        "nvar": nvar,
+        "nclauses": len(weights),
+        "clause_ptr": clause_ptr,
+        "clause_vars": clause_vars,
+        "clause_signs": (literals > 0).astype(np.uint8),
+        "weights": weights,
+        "hard": hard,
+        "top": top,
+    }
@@ -0,0 +1,226 @@
+"""
+Genetic algorithm with the optimal recombination (partition crossover) as the recombination operator.
+It works with any instance with the methods evaluatePopulation (objective values of the rows of a 2d array) and toArrays/fromArrays (only if 'processes' is given), e.g., NKLandscape or MAXSAT.
+The objective value is maximized, as in the instances.
+
+In each generation:
+    - pairs of parents are chosen by the selection ("tournament" or "uniform")
+    - each pair is recombined, with probability 'crossover_rate', with Recombiner.recombine_batch. The fitness of each offspring is given by the recombination, without evaluating it. Otherwise, the offspring is a copy of its first parent
+      The cost of each recombination is limited by 'beta', 'max_cells', 'max_bytes' and 'deadline' (see Recombiner.recombine). By default, a recombination that would need more than 1 GiB gives the best parent (the "parent" fallback), since the parents of the first generations may differ in too many variables
+    - each variable of each offspring is flipped with probability 'mutation_rate' (1/n by default), and only the mutated offspring that are not in the population are evaluated, all at once
+    - the next population is chosen by the replacement:
+        - "generational": the offspring replace the population, except its best 'elitism' individuals
+        - "plus": the best individuals among the population and the offspring (the (mu+lambda) replacement)
+      In both, identical individuals (with the same hash) are only kept if there are not enough different ones
+The statistics of each generation (e.g., the number of recombinations and evaluations per second) are stored in 'history' and printed if 'verbose' is True.
+"""
+
+import time
+import numpy as np
+from OptimalRecombination import Recombiner
+
+SELECTIONS = ["tournament", "uniform"]
+REPLACEMENTS = ["generational", "plus"]
+
+# NKLandscape and MAXSAT give the number of variables with different methods
+def getNumberOfVariables(inst):
+    if hasattr(inst, "getNumOfVariables"):
+        return inst.getNumOfVariables()
+    return inst.getNumberOfVariables()
+
+# the hash of each row of X (each individual)
+def hashIndividuals(X):
+    return [row.tobytes() for row in np.ascontiguousarray(X)]
+
+# indices of the rows with a different hash, in the order they appear in 'hashes', followed by the indices of the repeated ones
+def uniqueFirst(hashes):
+    seen = set()
+    unique, repeated = [], []
+    for i in range(len(hashes)):
+        if hashes[i] in seen:
+            repeated.append(i)
+        else:
+            seen.add(hashes[i])
+            unique.append(i)
+    return unique + repeated, len(unique)
+
+
+class GeneticAlgorithm:
+
+    # 'recombiner' is the Recombiner used by the recombination (by default, a new Recombiner of 'inst')
+    # If 'processes' is given, the recombinations of each generation are done in a pool of processes, with the instance in shared memory (see parallel_recombination.SharedRecombinationPool). The pool is created once in each call to run
+    # 'beta', 'max_cells', 'max_bytes', 'deadline' and 'fallback' are passed to each recombination (see Recombiner.recombine). With "raise", the algorithm stops when a budget is exceeded
+    def __init__(self, inst, population_size=100, offspring_size=None, selection="tournament", tournament_size=2, crossover_rate=1.0, mutation_rate=None, replacement="generational", elitism=1, recombiner=None, processes=None, beta=None, max_cells=None, max_bytes=1 << 30, deadline=None, fallback="parent", seed=None, verbose=False):
+        if selection not in SELECTIONS:
+            raise ValueError("Unknown selection: {0}".format(selection))
+        if replacement not in REPLACEMENTS:
+            raise ValueError("Unknown replacement: {0}".format(replacement))
+
+        self.instance = inst
+        self.n = getNumberOfVariables(inst)
+        self.population_size = population_size
+        self.offspring_size = population_size if offspring_size is None else offspring_size
+        self.selection = selection
+        self.tournament_size = tournament_size
+        self.crossover_rate = crossover_rate
+        self.mutation_rate = 1/self.n if mutation_rate is None else mutation_rate
+        self.replacement = replacement
+        self.elitism = elitism
+        self.recombiner = Recombiner(inst) if recombiner is None else recombiner
+        self.processes = processes
+        self.recombine_kwargs = {"beta": beta, "max_cells": max_cells, "max_bytes": max_bytes, "deadline": deadline, "fallback": fallback}
+        self.rng = np.random.default_rng(seed)
+        self.verbose = verbose
+
+        self.pool = None # the SharedRecombinationPool used during run, if 'processes' is given
+        self.population = None
+        self.fitness = None
+        self.history = []
+        self.evaluations = 0
+
+    # evaluate the individuals in the rows of X, all at once
+    def evaluate(self, X):
+        self.evaluations += len(X)
+        return np.asarray(self.instance.evaluatePopulation(X), dtype=float)
+
+    def initialize(self):
+        self.population = self.rng.integers(0, 2, size=(self.population_size, self.n), dtype=np.int8)
+        self.fitness = self.evaluate(self.population)
+        self.history = []
+
+    # indices, in the population, of 'count' parents
+    def select(self, count):
+        if self.selection == "uniform":
+            return self.rng.integers(0, len(self.population), size=count)
+
+        candidates = self.rng.integers(0, len(self.population), size=(count, self.tournament_size))
+        return candidates[np.arange(count), np.argmax(self.fitness[candidates], axis=1)]
+
+    # recombine the pairs of parents in the rows of P1 and P2. Returns the offspring and their fitnesses
+    def recombine(self, P1, P2, fitness1):
+        if self.pool is not None:
+            return self.pool.recombine(P1, P2, fitness1)
+        if self.processes is not None:
+            from parallel_recombination import recombine_shared
+            return recombine_shared(self.recombiner, P1, P2, fitness1, self.processes, self.recombine_kwargs)
+        return self.recombiner.recombine_batch(P1, P2, fitness1, **self.recombine_kwargs)
+
+    # flip each variable of X with probability mutation_rate. Returns the indices of the mutated rows
+    def mutate(self, X):
+        flips = self.rng.random(X.shape) < self.mutation_rate
+        X ^= flips.astype(X.dtype)
+        return np.flatnonzero(flips.any(axis=1))
+
+    # Choose the next population from the current one and the offspring (see the replacement in the description of the module)
+    def replace(self, offspring, off_fitness):
+        if self.replacement == "plus":
+            candidates = np.concatenate([self.population, offspring])
+            fitness = np.concatenate([self.fitness, off_fitness])
+            by_fitness = np.argsort(-fitness, kind="stable")
+        else:
+            elite = np.argsort(-self.fitness, kind="stable")
+            candidates = np.concatenate([self.population[elite[:self.elitism]], offspring, self.population[elite[self.elitism:]]])
+            fitness = np.concatenate([self.fitness[elite[:self.elitism]], off_fitness, self.fitness[elite[self.elitism:]]])
+            by_fitness = np.arange(len(candidates))
+
+        order, n_unique = uniqueFirst(hashIndividuals(candidates[by_fitness]))
+        chosen = by_fitness[order[:self.population_size]]
+        self.population, self.fitness = candidates[chosen], fitness[chosen]
+        return min(n_unique, self.population_size)
+
+    # Replace the worst individuals of the population by the individuals in the rows of X (e.g., migrants from another population), with the given fitnesses.
+    # The individuals already in the population are ignored. Returns the number of individuals inserted
+    def insert(self, X, fitness):
+        present = set(hashIndividuals(self.population))
+        hashes = hashIndividuals(X)
+        new = [i for i in range(len(X)) if hashes[i] not in present and hashes[i] not in hashes[:i]][:len(self.population)]
+
+        worst = np.argsort(self.fitness, kind="stable")[:len(new)]
+        self.population[worst] = X[new]
+        self.fitness[worst] = np.asarray(fitness)[new]
+        return len(new)
+
+    # the 'count' best individuals of the population and their fitnesses
+    def best(self, count=1):
+        order = np.argsort(-self.fitness, kind="stable")[:count]
+        return self.population[order].copy(), self.fitness[order].copy()
+
+    # one generation of the algorithm. Returns its statistics
+    def step(self):
+        start = time.perf_counter()
+        evaluations = self.evaluations
+
+        parents = self.select(2*self.offspring_size)
+        P1, P2 = self.population[parents[0::2]], self.population[parents[1::2]]
+        fitness1 = self.fitness[parents[0::2]]
+
+        # recombination
+        crossed = np.flatnonzero(self.rng.random(self.offspring_size) < self.crossover_rate)
+        offspring, off_fitness = P1.copy(), fitness1.copy()
+        recombination_start = time.perf_counter()
+        if len(crossed) > 0:
+            offspring[crossed], off_fitness[crossed] = self.recombine(P1[crossed], P2[crossed], fitness1[crossed])
+        recombination_time = time.perf_counter() - recombination_start
+
+        # mutation: the fitness of the mutated offspring already in the population is known, and the others are evaluated (once for identical offspring)
+        mutated = self.mutate(offspring)
+        evaluation_start = time.perf_counter()
+        if len(mutated) > 0:
+            known = dict(zip(hashIndividuals(self.population), self.fitness))
+            hashes = hashIndividuals(offspring[mutated])
+            unknown = {} # hash -> index in 'mutated' of the first offspring with this hash
+            for i in range(len(mutated)):
+                if hashes[i] not in known and hashes[i] not in unknown:
+                    unknown[hashes[i]] = i
+            if len(unknown) > 0:
+                known.update(zip(unknown.keys(), self.evaluate(offspring[mutated[list(unknown.values())]])))
+            off_fitness[mutated] = [known[h] for h in hashes]
+        evaluation_time = time.perf_counter() - evaluation_start
+
+        n_unique = self.replace(offspring, off_fitness)
+
+        elapsed = time.perf_counter() - start
+        evaluations = self.evaluations - evaluations
+        stats = {
+            "generation": len(self.history)+1,
+            "best": float(self.fitness.max()),
+            "mean": float(self.fitness.mean()),
+            "unique": n_unique,
+            "recombinations": len(crossed),
+            "recombinations/s": len(crossed)/recombination_time if recombination_time > 0 else 0.0,
+            "recombination_time": recombination_time,
+            "evaluations": evaluations,
+            "evaluations/s": evaluations/evaluation_time if evaluation_time > 0 else 0.0,
+            "evaluation_time": evaluation_time,
+            "time": elapsed,
+        }
+        self.history.append(stats)
+        if self.verbose:
+            print("generation {generation}: best {best:.6g}, mean {mean:.6g}, {unique} unique, {recombinations/s:.1f} recombinations/s, {evaluations/s:.1f} evaluations/s, {time:.3f}s".format(**stats))
+        return stats
+
+    # Run the algorithm for 'generations' generations, or until 'max_time' seconds have passed, or until the best fitness reaches 'target'.
+    # Returns the best individual and its fitness
+    def run(self, generations=100, max_time=None, target=None):
+        if self.population is None:
+            self.initialize()
+
+        if self.processes is not None:
+            from parallel_recombination import SharedRecombinationPool
+            self.pool = SharedRecombinationPool(self.recombiner, (self.offspring_size, self.n), self.population.dtype, self.processes, self.recombine_kwargs)
+
+        end_time = None if max_time is None else time.monotonic() + max_time
+        try:
+            for _ in range(generations):
+                self.step()
+                if end_time is not None and time.monotonic() >= end_time:
+                    break
+                if target is not None and self.fitness.max() >= target:
+                    break
+        finally:
+            if self.pool is not None:
+                self.pool.close()
+                self.pool = None
+
+        best = int(np.argmax(self.fitness))
+        return self.population[best].copy(), float(self.fitness[best])
@@ -1,12 +1,26 @@
-import networkx as nx
-import nx_junction_tree as nxjt
-import matplotlib.pyplot as plt
-
+import native_junction_tree as njt
+
+"""
+The recombination graph and its clique tree.
+Two backends are available:
+    - "native" (default): the graphs are stored in adjacency sets and the triangulation and clique tree are computed in native_junction_tree
+    - "networkx": the graphs are networkx graphs and the clique tree is computed in nx_junction_tree
+networkx (and matplotlib) are only imported by the "networkx" backend and by the print_* functions.
+'ordering' is the elimination ordering used to triangulate the graph ("mcs", "min-fill", "min-degree" or "auto", see native_junction_tree.triangulate).
+"""
 class Graph:
 
-    def __init__(self):
+    def __init__(self, backend="native", ordering="mcs"):
 
-        self.graph = nx.Graph() # the recombination graph
+        self.backend = backend
+        self.ordering = ordering
+        if backend == "native":
+            self.graph = njt.AdjacencyGraph() # the recombination graph
+        elif backend == "networkx":
+            import networkx as nx
+            self.graph = nx.Graph() # the recombination graph
+        else:
+            raise ValueError("Unknown graph backend: {0}".format(backend))
 
         self.clique_tree = None
         self.cliques = None # the nodes of the clique tree
@@ -35,7 +49,7 @@ class Graph:
 
     # assign sub-functions to the cliques
     def assignSubFuncs(self, sub_funcs):
-        if(self.clique_tree == None):
+        if(self.clique_tree is None):
             _ = self.getCliqueTree() # we do everything at once
 
         self.getCliqueTreePostOrder()
@@ -72,72 +86,99 @@ class Graph:
         return self.max_node_value
 
     # Returns the clique tree. Creates one, if non-existent.
-    def getCliqueTree(self):
-        if(self.clique_tree == None):
-            self.clique_tree, self.cliques, self.chordal_graph, self.alpha = nxjt.junction_tree(self.graph)
-        self.alpha_inv = {}
-        for k, v in self.alpha.items():
-            self.alpha_inv[v] = k
+    # 'ordering', if given, replaces the elimination ordering given in the constructor. It has no effect if the clique tree already exists.
+    def getCliqueTree(self, ordering=None):
+        if(self.clique_tree is None):
+            if ordering is not None:
+                self.ordering = ordering
+
+            if self.backend == "native":
+                self.clique_tree, self.cliques, self.chordal_graph, self.alpha = njt.junction_tree(self.graph, self.ordering)
+            else:
+                import nx_junction_tree as nxjt
+                self.clique_tree, self.cliques, self.chordal_graph, self.alpha = nxjt.junction_tree(self.graph, self.ordering)
+
+            self.alpha_inv = {}
+            for k, v in self.alpha.items():
+                self.alpha_inv[v] = k
         return self.clique_tree
 
 
     def getAlpha(self):
-        if(self.alpha == None):
+        if(self.alpha is None):
             _ = self.getCliqueTree()
         return self.alpha
 
     def getAlphaInv(self):
-        if(self.alpha == None):
+        if(self.alpha is None):
             _ = self.getCliqueTree()
         return self.alpha_inv
 
-    # get the nodes (cliques) of the clique tree
+    # get the nodes (cliques) of the clique tree, as tuples of variables. With both backends, only the cliques are returned, without their attributes (see getCliqueSeparator and getCliqueResidue)
     def getCliques(self):
-        if(self.cliques == None):
-            _ = self.getCliqueTree()
-        return self.cliques
+        return list(self.getCliqueTree().nodes)
 
     # get the separator of a given clique
     def getCliqueSeparator(self, clique):
-        if(self.clique_tree == None):
+        if(self.clique_tree is None):
             _ = self.getCliqueTree()
         return self.cliques[clique]["sepset"]
 
     # get the separator of a given clique
     def getCliqueResidue(self, clique):
-        if(self.clique_tree == None):
+        if(self.clique_tree is None):
             _ = self.getCliqueTree()
         return self.cliques[clique]["resset"]
 
+    # get the cliques in post-order. The post-order is computed only once, and a copy is returned since the callers may change the list
     def getCliqueTreePostOrder(self):
-        if(self.clique_tree == None):
-            _ = self.getCliqueTree()
-        self.cliqueTreePostOrder = list(nx.dfs_postorder_nodes(self.clique_tree))
-        return self.cliqueTreePostOrder
+        if(self.cliqueTreePostOrder is None):
+            if self.backend == "native":
+                self.cliqueTreePostOrder = list(self.getCliqueTree().post_order)
+            else:
+                import networkx as nx
+                self.cliqueTreePostOrder = list(nx.dfs_postorder_nodes(self.getCliqueTree()))
+        return list(self.cliqueTreePostOrder)
 
     def getCliqueTreeBFS(self):
-        if(self.clique_tree == None):
-            _ = self.getCliqueTree()
-        return list(nx.bfs_edges(self.clique_tree))
+        if self.backend == "native":
+            return self.getCliqueTree().bfs_edges()
+
+        import networkx as nx
+        return list(nx.bfs_edges(self.getCliqueTree()))
+
+    # convert a graph of this class to networkx, to draw it
+    def toNetworkx(self, graph):
+        if self.backend == "native":
+            return graph.to_networkx()
+        return graph
 
     # draw the recombination graph
     def print_graph(self):
-        nx.draw_networkx(self.graph, pos=nx.spring_layout(self.graph), with_labels=True, node_size=1000, connectionstyle='arc3, rad = 0.4', label="Recombination Graph")
+        import networkx as nx
+        import matplotlib.pyplot as plt
+
+        graph = self.toNetworkx(self.graph)
+        nx.draw_networkx(graph, pos=nx.spring_layout(graph), with_labels=True, node_size=1000, connectionstyle='arc3, rad = 0.4', label="Recombination Graph")
         plt.show()
 
     # print the clique tree
     def print_clique_tree(self):
-        if(self.clique_tree == None):
-            self.getCliqueTree()
+        import networkx as nx
+        import matplotlib.pyplot as plt
 
+        clique_tree = self.toNetworkx(self.getCliqueTree())
         plt.figure(1, figsize=(15, 30))
-        nx.draw_networkx(self.clique_tree, pos=nx.planar_layout(self.clique_tree), with_labels = True, node_size = 5000, connectionstyle='arc3, rad = 0.1', arrowsize=20, label="Clique Tree")
+        nx.draw_networkx(clique_tree, pos=nx.planar_layout(clique_tree), with_labels = True, node_size = 5000, connectionstyle='arc3, rad = 0.1', arrowsize=20, label="Clique Tree")
         plt.show()
 
     # print the chordal graph
     def print_chordal_graph(self):
-        if(self.chordal_graph == None):
+        import networkx as nx
+        import matplotlib.pyplot as plt
+
+        if(self.chordal_graph is None):
             _ = self.getCliqueTree()
 
-        nx.draw_networkx(self.chordal_graph, with_labels = True, node_size = 500, connectionstyle='arc3, rad = 0.1', label="Chordal Graph")
+        nx.draw_networkx(self.toNetworkx(self.chordal_graph), with_labels = True, node_size = 500, connectionstyle='arc3, rad = 0.1', label="Chordal Graph")
         plt.show()
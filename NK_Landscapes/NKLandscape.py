@@ -1,6 +1,7 @@
 import numpy as np
 import random as rnd
 from collections import defaultdict
+from instance_cache import saveArrays, loadArrays
 
 def getBinaryArray(b, n_bits):
     if n_bits == 0:
@@ -35,7 +36,10 @@ class NKLandscape:
         self.m = m
         self.vars = [i for i in range(self.n)]
         self.createSubfunctions()
+        self.createIncidenceIndex()
         self.setSubFunctionsValues()
+        self.createSubFunctionsTables()
+        self.tablesByLength = None # see getTablesByLength
 
     # Create the sub-functions for this instance
     def createSubfunctions(self):
@@ -87,6 +91,27 @@ class NKLandscape:
             self.subFunctions.append(tuple(sorted([i for i in range(len(sf_mx[sf])) if sf_mx[sf][i] == 1])))
 
 
+    # Create an index, in CSR format, of the sub-functions where each variable appears.
+    # The sub-functions of variable v are self.incidenceIdx[self.incidencePtr[v]:self.incidencePtr[v+1]]
+    def createIncidenceIndex(self):
+        sf_vars = np.array([v for sf in self.subFunctions for v in sf], dtype=np.int64)
+        sf_ids = np.repeat(np.arange(len(self.subFunctions), dtype=np.int64), [len(sf) for sf in self.subFunctions])
+        n_vars = max(self.n, int(sf_vars.max())+1 if len(sf_vars) > 0 else 0)
+
+        self.incidenceIdx = sf_ids[np.argsort(sf_vars, kind="stable")]
+        self.incidencePtr = np.zeros(n_vars+1, dtype=np.int64)
+        np.cumsum(np.bincount(sf_vars, minlength=n_vars), out=self.incidencePtr[1:])
+
+    # get the indices (sorted, without repetitions) of the sub-functions where at least one of the given variables appears
+    def getIncidentSubFunctions(self, variables):
+        variables = np.asarray(variables, dtype=np.int64)
+        starts = self.incidencePtr[variables]
+        lens = self.incidencePtr[variables+1] - starts
+
+        # positions, in self.incidenceIdx, of the sub-functions of all the variables
+        positions = np.repeat(starts - np.cumsum(lens) + lens, lens) + np.arange(lens.sum())
+        return np.unique(self.incidenceIdx[positions])
+
     # for each sub-function, for each combination of values in its variables, assign a random real number as its objective value
     def setSubFunctionsValues(self):
 
@@ -100,11 +125,63 @@ class NKLandscape:
                 self.sFuncsValues[i][bin_tuple] = rnd.randint(5, 50)
 
 
+    # for each sub-function, store its values in an array where the position of each combination of values is the integer represented by the combination (as in binArrayToInt).
+    # The combinations without a value in self.sFuncsValues have value 0, as in getSFObjectiveValue
+    def createSubFunctionsTables(self):
+        self.sFuncsTables = []
+
+        for i in range(len(self.subFunctions)):
+            nVars = len(self.subFunctions[i])
+            table = np.zeros(2**nVars)
+            for bin_tuple, val in self.sFuncsValues[i].items():
+                table[binArrayToInt(bin_tuple)] = val
+            self.sFuncsTables.append(table)
+
     # get the objective value of a sub-function sf_ix, givena tuple of values for its variables, t
+    # The value is read from the table of the sub-function (see createSubFunctionsTables), which has the same values as self.sFuncsValues and is also available in the instances created by fromArrays
     def getSFObjectiveValue(self, sf_ix, t):
-        return self.sFuncsValues[sf_ix][t]
-
+        return self.sFuncsTables[sf_ix][binArrayToInt(t)]
+
+    # get the values of sub-function sf_ix for all the combinations of its variables (see createSubFunctionsTables)
+    def getSFTable(self, sf_ix):
+        return self.sFuncsTables[sf_ix]
+
+    # objective value of the solution x (an array with the value of each variable), i.e., the sum of the values of all sub-functions
+    def evaluateSolution(self, x):
+        x = np.asarray(x)
+        value = 0
+        for s in range(len(self.subFunctions)):
+            sf = list(self.subFunctions[s])
+            value += self.sFuncsTables[s][x[sf].dot(1 << np.arange(len(sf)-1, -1, -1))]
+        return value
+
+    # objective values of all the solutions in the rows of the 2d array X (a population), computed at once for all the sub-functions with the same number of variables
+    def evaluatePopulation(self, X):
+        X = np.asarray(X)
+        values = np.zeros(len(X))
+        for n_vars, (variables, tables) in self.getTablesByLength().items():
+            # position of the values of each solution (row) in the table of each sub-function (column)
+            positions = X[:, variables].dot(1 << np.arange(n_vars-1, -1, -1))
+            values += tables[np.arange(len(tables)), positions].sum(axis=1)
+        return values
+
+    # the variables and tables of the sub-functions, grouped by their number of variables in 2d arrays, created when first needed
+    def getTablesByLength(self):
+        if self.tablesByLength is None:
+            lengths = {}
+            for s in range(len(self.subFunctions)):
+                lengths.setdefault(len(self.subFunctions[s]), []).append(s)
+            self.tablesByLength = {n_vars: (np.array([self.subFunctions[s] for s in sfs], dtype=np.int64).reshape(len(sfs), n_vars), np.array([self.sFuncsTables[s] for s in sfs])) for n_vars, sfs in lengths.items()}
+        return self.tablesByLength
+
+    # The values of the sub-functions, as in setSubFunctionsValues. In the instances created by fromArrays, they are created from the tables when first needed
     def getSubFunctionsEvals(self):
+        if self.sFuncsValues is None:
+            self.sFuncsValues = defaultdict(lambda : defaultdict(float))
+            for i in range(len(self.subFunctions)):
+                table = self.sFuncsTables[i]
+                for a in np.flatnonzero(table):
+                    self.sFuncsValues[i][tuple(getBinaryArray(int(a), len(self.subFunctions[i])))] = table[a]
         return self.sFuncsValues
 
     def getSubFunctions(self):
@@ -112,3 +189,48 @@ class NKLandscape:
 
     def getNumOfVariables(self):
         return self.n
+
+    """
+    The instance in flat numpy arrays, e.g., to store it in shared memory (see parallel_recombination.py):
+        - "shape": the number of variables, the number of variables per sub-function and the number of sub-functions (n, k, m)
+        - "sf_ptr", "sf_vars": the variables of sub-function i are sf_vars[sf_ptr[i]:sf_ptr[i+1]]
+        - "table_ptr", "tables": the table of sub-function i (see createSubFunctionsTables) is tables[table_ptr[i]:table_ptr[i+1]]
+    """
+    def toArrays(self):
+        sf_lens = np.array([len(sf) for sf in self.subFunctions], dtype=np.int64)
+        sf_ptr = np.zeros(len(sf_lens)+1, dtype=np.int64)
+        np.cumsum(sf_lens, out=sf_ptr[1:])
+        table_ptr = np.zeros(len(sf_lens)+1, dtype=np.int64)
+        np.cumsum(2**sf_lens, out=table_ptr[1:])
+
+        return {
+            "shape": np.array([self.n, self.k, self.m], dtype=np.int64),
+            "sf_ptr": sf_ptr,
+            "sf_vars": np.array([v for sf in self.subFunctions for v in sf], dtype=np.int64),
+            "table_ptr": table_ptr,
+            "tables": np.concatenate(self.sFuncsTables) if len(self.sFuncsTables) > 0 else np.zeros(0),
+        }
+
+    # Create an instance from the arrays returned by toArrays. The tables of the sub-functions are views of arrays["tables"], which is not copied
+    @classmethod
+    def fromArrays(cls, arrays):
+        inst = cls.__new__(cls)
+        inst.n, inst.k, inst.m = [int(v) for v in arrays["shape"]]
+        inst.vars = [i for i in range(inst.n)]
+
+        sf_ptr, sf_vars, table_ptr, tables = arrays["sf_ptr"], arrays["sf_vars"].tolist(), arrays["table_ptr"], arrays["tables"]
+        inst.subFunctions = [tuple(sf_vars[sf_ptr[i]:sf_ptr[i+1]]) for i in range(len(sf_ptr)-1)]
+        inst.sFuncsTables = [tables[table_ptr[i]:table_ptr[i+1]] for i in range(len(table_ptr)-1)]
+        inst.sFuncsValues = None # see getSubFunctionsEvals
+        inst.tablesByLength = None
+        inst.createIncidenceIndex()
+        return inst
+
+    # save the instance in binary files, in 'directory' (see instance_cache.py)
+    def save(self, directory):
+        saveArrays(directory, self.toArrays(), {"class": "NKLandscape"})
+
+    # load an instance saved by save. With mmap_mode="r", the tables are memory maps of the files, shared by all the processes that load them
+    @classmethod
+    def load(cls, directory, mmap_mode="r"):
+        return cls.fromArrays(loadArrays(directory, mmap_mode)[0])
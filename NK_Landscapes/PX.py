@@ -1,12 +1,17 @@
 
+import copy
 import instance
+import numpy as np
 class PX:
 
-    def __init__(self, p1, p2):
+    # 'inst' is the problem instance being recombined. If not given, the one in instance.instance is used.
+    def __init__(self, p1, p2, inst=None):
 
-        self.p1 = p1
-        self.p2 = p2
-        self.original_subfunctions = instance.instance.getSubFunctions()
+        self.p1 = np.asarray(p1)
+        self.p2 = np.asarray(p2)
+        self.instance = inst if inst is not None else instance.instance
+        self.original_subfunctions = self.instance.getSubFunctions()
+        self.tables = {} # tables of the new sub-functions already computed by evaluate_table
         self.createSubfunctions()
 
 
@@ -14,29 +19,14 @@ class PX:
     Helper functions
     """
 
-    # Identify common and different variables between the parents
+    # Identify the different variables between the parents
+    # The common variables are not stored: they are all the positions not in self.diffVars, and storing them would cost O(n) in every recombination
     def findCommonVariables(self):
-        self.commonVars = [] # list of common variables
-        self.diffVars = [] # list of the different variables that will compose the new sub-functions sent to the algorithm
-
-        for i in range(len(self.p1)):
-            if(self.p1[i] != self.p2[i]):
-                self.diffVars.append(i)
-            else:
-                self.commonVars.append(i)
-
-        self.diffVars.sort()
-        self.commonVars.sort()
-
-        self.varsMap = {} # mapping original variables *to* new variable (index)
-        self.varsMapInv = {} # inverse mapping of self.varsMap
+        self.diffVars = np.flatnonzero(self.p1 != self.p2) # array (sorted) of the different variables that will compose the new sub-functions sent to the algorithm
 
         # Create a mapping for diffVars so that the corresponding variables in the new sub-functions are numbered consecutively
-        for ix in range(len(self.diffVars)):
-            v = self.diffVars[ix]
-            self.varsMap[v] = ix
-            self.varsMapInv[ix] = v
-
+        self.varsMapInv = self.diffVars.tolist() # mapping of each new variable (index) to the original variable
+        self.varsMap = {v: ix for ix, v in enumerate(self.varsMapInv)} # inverse mapping of self.varsMapInv: original variables *to* new variable (index)
 
     # create the new sub-functions, by removing the variables with values in common in the original sub-functions
     # the arguments (variables) in the new sub-functions (tuples) are determined according with self.varsMap
@@ -49,13 +39,14 @@ class PX:
         # search for common variables (and different)
         self.findCommonVariables()
 
-        for s in range(len(self.original_subfunctions)):
+        # only the sub-functions with at least one variable in diffVars are considered. They are found with the instance's index of the sub-functions of each variable
+        for s in self.instance.getIncidentSubFunctions(self.diffVars).tolist():
             sf = self.original_subfunctions[s]
             n_sf = [] # the new subFunction
 
             # create the new sub-function from sf with only variables with different values in both parents
             for v in sf:
-                if(v in self.diffVars):
+                if(v in self.varsMap):
                     n_sf.append(self.varsMap[v])
 
             if(len(n_sf)>0):
@@ -63,9 +54,38 @@ class PX:
                 self.sfsMappingInv[self.sfsMapping[s]] = s
                 self.sfs.append(tuple(n_sf))
 
+    # Returns the PX of the parents p1 and p2, which must differ in the same variables as self.p1 and self.p2.
+    # The new sub-functions only depend on these variables, so they (and their mappings) are shared with this PX instead of being created again
+    def withParents(self, p1, p2):
+        px = copy.copy(self)
+        px.p1 = np.asarray(p1)
+        px.p2 = np.asarray(p2)
+        px.tables = {}
+        return px
+
+    # Get the values of the variables in the original sub-function of the new sub-function i, for all the 2^len(self.sfs[i]) combinations of choices in t (see evaluate).
+    # Row b has the values for the choices in the binary array of b, where the first choice is the most significant bit. Column j corresponds to the j-th variable of the original sub-function.
+    def getTableAssignments(self, i):
+        orig_sf = self.original_subfunctions[self.sfsMappingInv[i]]
+        n_sf = self.sfs[i]
+        n_bits = len(n_sf)
+
+        choices = (np.arange(2**n_bits)[:, None] >> np.arange(n_bits-1, -1, -1)) & 1
 
+        # position, in n_sf, of the choice for each new variable. As in evaluate, if a variable appears more than once, the last choice is the one used
+        choice_ix = {}
+        for v in range(n_bits):
+            choice_ix[n_sf[v]] = v
 
+        values = np.empty((2**n_bits, len(orig_sf)), dtype=int)
+        for j in range(len(orig_sf)):
+            var = orig_sf[j]
+            if var in self.varsMap:
+                values[:, j] = np.where(choices[:, choice_ix[self.varsMap[var]]] == 0, self.p1[var], self.p2[var])
+            else:
+                values[:, j] = self.p1[var] # same value in both parents
 
+        return values
 
     """
     API Functions
@@ -106,23 +126,34 @@ class PX:
         new_t = tuple([map[v] for v in orig_sf]) # construct the new tuple with all the variables, considering the order they appear in the original sub-function
 
         # negate the objective value of the sub-function, because the implementation of the DPX assumes minimization
-        return -1*instance.instance.getSFObjectiveValue(self.sfsMappingInv[i], new_t)
+        return -1*self.instance.getSFObjectiveValue(self.sfsMappingInv[i], new_t)
+
+    # Returns the values of evaluate(i, t) for all the 2^len(t) tuples t, as an array where the value of t is in the position given by the integer represented by t (the first choice is the most significant bit).
+    # Each table is computed only once per recombination.
+    def evaluate_table(self, i):
+        if i not in self.tables:
+            self.tables[i] = self.computeTable(i)
+        return self.tables[i]
+
+    def computeTable(self, i):
+        # the position of each combination of values in the table of the original sub-function
+        values = self.getTableAssignments(i)
+        positions = values.dot(1 << np.arange(values.shape[1]-1, -1, -1))
+
+        # negate the objective value of the sub-function, because the implementation of the DPX assumes minimization
+        return -1*self.instance.getSFTable(self.sfsMappingInv[i])[positions]
 
     # construct the offsring given the choices in t (a tuple), where a value of 0 corresponds to self.p1 and 1 to self.p2
-    def offspring(self, t):
+    # The offspring is a copy of self.p1 where only the variables chosen from self.p2 are overwritten.
+    # If 'flipped' is True, only the array with the (original) variables where the offspring differs from self.p1 is returned
+    def offspring(self, t, flipped=False):
 
         # each index, i, in t represents the variable i, as it was sent to the algorithm in the sub-functions, according to varsMap
-        off = [-1]*len(self.p1)
-
-        for v in range(len(t)):
-            real_v = self.varsMapInv[v]
-            if(t[v] == 0):
-                off[real_v] = self.p1[real_v]
-            else:
-                off[real_v] = self.p2[real_v]
+        flips = self.diffVars[np.asarray(t, dtype=int) == 1]
+        if flipped:
+            return flips
 
-        # add the common values
-        for v in self.commonVars:
-            off[v] = self.p1[v]
+        off = self.p1.copy()
+        off[flips] = self.p2[flips]
 
         return off
@@ -4,3 +4,9 @@ def init(_m, _k, _n):
     global n, k, m, instance
     n, k, m = _n, _k, _m
     instance = nk.NKLandscape(m, k, n)
+
+# load an instance saved with NKLandscape.save
+def load(directory):
+    global n, k, m, instance
+    instance = nk.NKLandscape.load(directory)
+    n, k, m = instance.n, instance.k, instance.m
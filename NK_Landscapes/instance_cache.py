@@ -0,0 +1,95 @@
+"""
+Binary files of the instances, to load them without parsing or generating them again.
+An instance is stored as the flat arrays returned by its toArrays method, in a directory with one .npy file per array and a metadata.json file.
+The arrays are loaded with np.load(mmap_mode="r") (which is not possible with .npz files), so the loading is almost instantaneous and all the processes that load the same files share the same (page cached) memory.
+The cache of an instance file (see cachedArrays) is keyed by the hash of the file, and it is created again when the file changes.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+
+__all__ = ["fileHash", "saveArrays", "loadArrays", "cachedArrays"]
+
+FORMAT_VERSION = 1
+METADATA = "metadata.json"
+
+# the sha256 of the file in 'path', read in blocks
+def fileHash(path, block_size=1 << 24):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        block = f.read(block_size)
+        while block:
+            h.update(block)
+            block = f.read(block_size)
+    return h.hexdigest()
+
+# Save the arrays (a dictionary of numpy arrays) and the metadata (a dictionary that can be written in json) in 'directory'.
+# The files are written in a temporary directory that then replaces 'directory', so a directory is never left incomplete.
+def saveArrays(directory, arrays, metadata=None):
+    directory = os.path.abspath(directory)
+    parent = os.path.dirname(directory)
+    os.makedirs(parent, exist_ok=True)
+
+    tmp = tempfile.mkdtemp(dir=parent, prefix=".tmp-")
+    try:
+        for key, a in arrays.items():
+            np.save(os.path.join(tmp, key + ".npy"), np.ascontiguousarray(a))
+        metadata = dict(metadata or {}, format=FORMAT_VERSION, arrays=sorted(arrays.keys()))
+        with open(os.path.join(tmp, METADATA), "w") as f:
+            json.dump(metadata, f)
+
+        if os.path.isdir(directory):
+            shutil.rmtree(directory)
+        os.replace(tmp, directory)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+# Load the arrays and the metadata saved by saveArrays. With mmap_mode="r", the arrays are read-only memory maps of the files
+def loadArrays(directory, mmap_mode="r"):
+    with open(os.path.join(directory, METADATA)) as f:
+        metadata = json.load(f)
+    if metadata.get("format") != FORMAT_VERSION:
+        raise ValueError("Unsupported version of the instance files in {0}".format(directory))
+
+    arrays = {key: np.load(os.path.join(directory, key + ".npy"), mmap_mode=mmap_mode) for key in metadata["arrays"]}
+    return arrays, metadata
+
+# the metadata of the cache in 'directory', or None if there is no (valid) cache
+def readMetadata(directory):
+    try:
+        with open(os.path.join(directory, METADATA)) as f:
+            metadata = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return metadata if metadata.get("format") == FORMAT_VERSION else None
+
+"""
+The arrays of the instance in the file 'source', taken from its cache when it is up to date, or created by build() (a function that returns the arrays) and saved in the cache otherwise.
+The cache is the directory <cache_dir>/<name of source>-<hash of the path of source>.cache (by default, cache_dir is the directory of source), and has the sha256 of source.
+When the size and modification time of source are the ones in the cache, the hash is not computed again.
+"""
+def cachedArrays(source, build, cache_dir=None, mmap_mode="r"):
+    source = os.path.abspath(source)
+    cache_dir = os.path.dirname(source) if cache_dir is None else cache_dir
+    directory = os.path.join(cache_dir, "{0}-{1}.cache".format(os.path.basename(source), hashlib.sha256(source.encode()).hexdigest()[:12]))
+    stat = os.stat(source)
+
+    metadata = readMetadata(directory)
+    if metadata is not None and (metadata.get("size"), metadata.get("mtime_ns")) == (stat.st_size, stat.st_mtime_ns):
+        return loadArrays(directory, mmap_mode)[0]
+
+    sha = fileHash(source)
+    if metadata is not None and metadata.get("sha256") == sha:
+        # same contents with a new modification time: only the metadata is updated
+        metadata.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+        with open(os.path.join(directory, METADATA), "w") as f:
+            json.dump(metadata, f)
+        return loadArrays(directory, mmap_mode)[0]
+
+    saveArrays(directory, build(), {"source": source, "sha256": sha, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns})
+    return loadArrays(directory, mmap_mode)[0]
@@ -1,4 +1,5 @@
 import numpy as np
+import os
 import sys
 import instance
 import NKLandscape
@@ -18,11 +19,18 @@ def evaluateOffpsring(off):
 if __name__ == "__main__":
 
     if(len(sys.argv) < 4):
-        print("Usage: {0} <num. of sub-functions> <num. of vars per sub-function> <num. of variables>".format(sys.argv[0]))
+        print("Usage: {0} <num. of sub-functions> <num. of vars per sub-function> <num. of variables> [<instance directory>]".format(sys.argv[0]))
         exit(0)
     m, k, n = int(sys.argv[1]), int(sys.argv[2]), int(sys.argv[3])
 
-    instance.init(m, k, n)
+    # if an instance directory is given, the instance saved in it is used or, if it does not exist, the new instance is saved in it
+    if len(sys.argv) > 4 and os.path.isdir(sys.argv[4]):
+        instance.load(sys.argv[4])
+        n = instance.n
+    else:
+        instance.init(m, k, n)
+        if len(sys.argv) > 4:
+            instance.instance.save(sys.argv[4])
 
 
     p1 = np.random.randint(2, size=n)
@@ -30,6 +38,6 @@ if __name__ == "__main__":
     print("Parent 1: {0} ".format(p1))
     print("Parent 2: {0} ".format(p2))
     print("\nRecombining...")
-    dpx_off = recombine(p1, p2)
+    dpx_off, fitness = recombine(p1, p2, return_fitness=True, fitness1=evaluateOffpsring(p1))
     print("Offspring: {0}".format(dpx_off))
-    print("Objective Value: {0}".format(evaluateOffpsring(dpx_off)))
+    print("Objective Value: {0}".format(fitness))
@@ -0,0 +1,371 @@
+"""
+Junction tree (clique tree) of a graph without networkx.
+It provides the same results as nx_junction_tree.junction_tree (the clique tree with the 'sepset', 'resset', 'sub_funcs' and 'id' attributes in each node, the cliques, the chordal graph and the alpha),
+but the graphs are stored in adjacency sets and the clique tree is read directly from the elimination ordering.
+
+References
+----------
+.. [1] A. Berry, J. Blair, P. Heggernes, and B. Peyton. Maximum Cardinality Search for Computing Minimal Triangulations of Graphs. Algorithmica, 39(4):287–298, 2004.
+.. [2] J. Blair and B. Peyton. An Introduction to Chordal Graphs and Clique Trees. In Graph Theory and Sparse Matrix Computation, pages 1–29. Springer, 1993.
+.. [3] U. Kjærulff. Triangulation of Graphs – Algorithms Giving Small Total State Space. Technical Report R-90-09, Aalborg University, 1990.
+"""
+
+import heapq
+
+__all__ = ["AdjacencyGraph", "CliqueTree", "junction_tree", "triangulate", "triangulate_cliques", "ORDERINGS"]
+
+# the elimination orderings available to triangulate the graph (see triangulate)
+ORDERINGS = ["mcs", "min-fill", "min-degree", "auto"]
+
+
+# Undirected graph stored as a dictionary with the set of neighbours of each node.
+# It has the methods of networkx.Graph used by the Graph class.
+class AdjacencyGraph:
+
+    def __init__(self):
+        self.adj = {} # the nodes are kept in insertion order, as in networkx
+
+    def add_node(self, v):
+        if v not in self.adj:
+            self.adj[v] = set()
+
+    def add_edge(self, u, v):
+        self.add_node(u)
+        self.add_node(v)
+        if u != v:
+            self.adj[u].add(v)
+            self.adj[v].add(u)
+
+    def has_edge(self, u, v):
+        return u in self.adj and v in self.adj[u]
+
+    def neighbors(self, v):
+        return iter(self.adj[v])
+
+    @property
+    def nodes(self):
+        return list(self.adj)
+
+    def copy(self):
+        G = AdjacencyGraph()
+        for v, neighbours in self.adj.items():
+            G.adj[v] = set(neighbours)
+        return G
+
+    # used only to draw the graph
+    def to_networkx(self):
+        import networkx as nx
+        G = nx.Graph()
+        G.add_nodes_from(self.adj)
+        G.add_edges_from((u, v) for u in self.adj for v in self.adj[u])
+        return G
+
+
+# Clique tree (a forest, if the graph is disconnected) where each node is a clique (a tuple of variables).
+# 'nodes' maps each clique to its attributes and 'post_order' has the cliques ordered in post-order.
+class CliqueTree:
+
+    def __init__(self):
+        self.nodes = {}
+        self.adj = {}
+        self.post_order = []
+
+    def add_node(self, c, **attr):
+        self.nodes[c] = attr
+        self.adj[c] = []
+
+    def add_edge(self, u, v):
+        self.adj[u].append(v)
+        self.adj[v].append(u)
+
+    def neighbors(self, c):
+        return iter(self.adj[c])
+
+    def number_of_nodes(self):
+        return len(self.nodes)
+
+    # edges of the trees in breadth-first order, starting from each root
+    def bfs_edges(self):
+        edges = []
+        visited = set()
+        for root in reversed(self.post_order):
+            if root in visited:
+                continue
+            visited.add(root)
+            queue = [root]
+            while len(queue) > 0:
+                c = queue.pop(0)
+                for n in self.adj[c]:
+                    if n not in visited:
+                        visited.add(n)
+                        edges.append((c, n))
+                        queue.append(n)
+        return edges
+
+    # used only to draw the clique tree
+    def to_networkx(self):
+        import networkx as nx
+        G = nx.Graph()
+        G.add_nodes_from(self.nodes.items())
+        G.add_edges_from((u, v) for u in self.adj for v in self.adj[u])
+        return G
+
+
+"""
+Maximum cardinality search for minimal triangulations (MCS-M) [1], the same algorithm as networkx.algorithms.complete_to_chordal_graph.
+Ties between the unnumbered nodes with the highest weight are broken by the insertion order of the nodes, as in networkx.
+Returns the chordal graph and alpha, where alpha[v] is the position of node v in the elimination ordering (from 1 to the number of nodes).
+"""
+def complete_to_chordal_graph(G):
+    H = G.copy()
+    weight = {v: 0 for v in G.adj}
+    unnumbered = list(G.adj)
+    numbered = set()
+    alpha = {}
+
+    for i in range(len(unnumbered), 0, -1):
+        z = max(unnumbered, key=lambda v: weight[v])
+        unnumbered.remove(z)
+        numbered.add(z)
+        alpha[z] = i
+
+        # y is updated if there is a path from z to y with unnumbered intermediate nodes whose weight is lower than the weight of y.
+        # 'reach[y]' is the lowest possible maximum weight of the intermediate nodes of a path from z to y (-1 if y is a neighbour of z)
+        reach = {}
+        heap = []
+        for y in G.adj[z]:
+            if y not in numbered:
+                reach[y] = -1
+                heap.append((-1, y))
+        heapq.heapify(heap)
+
+        while len(heap) > 0:
+            r, y = heapq.heappop(heap)
+            if r > reach[y]:
+                continue
+            r_next = max(r, weight[y]) # y becomes an intermediate node
+            for x in G.adj[y]:
+                if x not in numbered and (x not in reach or r_next < reach[x]):
+                    reach[x] = r_next
+                    heapq.heappush(heap, (r_next, x))
+
+        update_nodes = [y for y in reach if reach[y] < weight[y]]
+
+        # during calculation of paths the weights should not be updated
+        for y in update_nodes:
+            weight[y] += 1
+            H.add_edge(z, y)
+
+    return H, alpha
+
+
+"""
+Greedy elimination orderings [3]. The node eliminated at each step is the one with the lowest cost, according to the heuristic:
+    - "min-degree": the number of neighbours of the node
+    - "min-fill": the number of edges added between its neighbours (fill-in), with ties broken by the degree
+When a node is eliminated, its neighbours become a clique, and only the costs of the nodes around it are updated.
+Returns the chordal graph (G with the fill-in edges) and alpha, as in complete_to_chordal_graph.
+"""
+def complete_by_elimination(G, heuristic="min-fill"):
+    H = G.copy()
+    adj = {v: set(G.adj[v]) for v in G.adj} # the graph with the nodes not eliminated yet
+
+    def cost(v):
+        neighbours = adj[v]
+        if heuristic == "min-degree":
+            return (len(neighbours),)
+
+        fill = 0
+        for a in neighbours:
+            for b in neighbours:
+                if a < b and b not in adj[a]:
+                    fill += 1
+
+        if heuristic == "min-fill":
+            return (fill, len(neighbours))
+        raise ValueError("Unknown elimination heuristic: {0}".format(heuristic))
+
+    # heap with the cost of each node. Outdated entries (with an older version of the node's cost) are skipped
+    version = {v: 0 for v in adj}
+    heap = [(cost(v), ix, v, 0) for ix, v in enumerate(adj)]
+    heapq.heapify(heap)
+    position = {v: ix for ix, v in enumerate(adj)} # used to break the remaining ties by insertion order
+
+    alpha = {}
+    i = 1
+    while len(heap) > 0:
+        _, _, z, z_version = heapq.heappop(heap)
+        if z in alpha or z_version != version[z]:
+            continue
+
+        alpha[z] = i
+        i += 1
+
+        neighbours = adj.pop(z)
+        for a in neighbours:
+            adj[a].discard(z)
+            for b in neighbours:
+                if a != b and b not in adj[a]:
+                    adj[a].add(b)
+                    H.add_edge(a, b)
+
+        # the cost of the neighbours of z, and of their neighbours, may have changed
+        affected = set(neighbours)
+        for a in neighbours:
+            affected.update(adj[a])
+        for v in affected:
+            version[v] += 1
+            heapq.heappush(heap, (cost(v), position[v], v, version[v]))
+
+    return H, alpha
+
+# sum of the sizes of the tables of the cliques (2^|clique| for binary variables), which is proportional to the work of the dynamic programming
+def total_table_size(cliques):
+    return sum(2**len(c) for c in cliques)
+
+"""
+Triangulate G with the given elimination ordering (one of ORDERINGS):
+    - "mcs": maximum cardinality search (MCS-M), as in networkx
+    - "min-fill", "min-degree": greedy elimination (see complete_by_elimination)
+    - "auto": tries the greedy "min-degree" and "min-fill" orderings and keeps the one with the smallest total table size of the cliques
+Returns the chordal graph and alpha.
+"""
+def triangulate(G, ordering="mcs"):
+    if ordering == "mcs":
+        return complete_to_chordal_graph(G)
+
+    if ordering == "auto":
+        return triangulate_cliques(G, ordering)[:2]
+
+    if ordering in ORDERINGS:
+        return complete_by_elimination(G, ordering)
+
+    raise ValueError("Unknown elimination ordering: {0}".format(ordering))
+
+# Triangulate G as triangulate, and get the cliques of the chordal graph and their parents (see cliques_from_ordering).
+# With "auto", the cliques are the ones already found to compare the orderings. Returns the chordal graph, alpha, the cliques and their parents
+def triangulate_cliques(G, ordering="mcs"):
+    if ordering != "auto":
+        H, alpha = triangulate(G, ordering)
+        return (H, alpha) + cliques_from_ordering(H, alpha)
+
+    best, best_size = None, None
+    for heuristic in ["min-degree", "min-fill"]:
+        H, alpha = complete_by_elimination(G, heuristic)
+        cliques, parents = cliques_from_ordering(H, alpha)
+        size = total_table_size(cliques)
+        if best is None or size < best_size:
+            best, best_size = (H, alpha, cliques, parents), size
+    return best
+
+
+"""
+Get the maximal cliques of the chordal graph H, and the clique tree that connects them, from the perfect elimination ordering alpha, in time linear in the size of H [2].
+Each node v, eliminated in the order of alpha, forms the clique {v} + M(v), where M(v) are the neighbours of v eliminated after it, and the parent of v is the node in M(v) eliminated first.
+The clique of v is not maximal iff v has a child u with M(u) = {v} + M(v), and in that case it is merged with the clique of u.
+Returns the cliques (tuples sorted by alpha) and, for each clique, the position of its parent clique in the list (-1 for the roots). A parent is always after its children.
+"""
+def cliques_from_ordering(H, alpha):
+    order = sorted(H.adj, key=lambda v: alpha[v])
+
+    higher = {} # M(v)
+    parent = {}
+    rep = {} # the node whose clique contains the clique of v
+    children_sizes = {} # for each node, the size of M(u) of its children u, mapped to one of these children
+
+    for v in order:
+        higher[v] = [u for u in H.adj[v] if alpha[u] > alpha[v]]
+        if len(higher[v]) > 0:
+            parent[v] = min(higher[v], key=lambda u: alpha[u])
+            children_sizes.setdefault(parent[v], {})[len(higher[v])] = v
+
+        u = children_sizes.get(v, {}).get(len(higher[v])+1)
+        rep[v] = v if u is None else rep[u]
+
+    cliques = []
+    clique_ix = {}
+    for v in order:
+        if rep[v] == v:
+            clique_ix[v] = len(cliques)
+            cliques.append(tuple(sorted([v] + higher[v], key=lambda u: alpha[u])))
+
+    parents = [-1]*len(cliques)
+    for v in order:
+        if v in parent and rep[v] != rep[parent[v]]:
+            parents[clique_ix[rep[v]]] = clique_ix[rep[parent[v]]]
+
+    # the parent of a clique is not necessarily after it in 'order', so the cliques are reordered such that every parent comes after its children
+    positions = postOrder(parents)
+    new_ix = {positions[i]: i for i in range(len(positions))}
+    return [cliques[i] for i in positions], [new_ix[parents[i]] if parents[i] >= 0 else -1 for i in positions]
+
+
+# positions of the nodes of the forest given by 'parents' in post-order
+def postOrder(parents):
+    children = [[] for _ in parents]
+    roots = []
+    for c in range(len(parents)):
+        if parents[c] >= 0:
+            children[parents[c]].append(c)
+        else:
+            roots.append(c)
+
+    order = []
+    for root in roots:
+        stack = [(root, False)]
+        while len(stack) > 0:
+            c, expanded = stack.pop()
+            if expanded:
+                order.append(c)
+            else:
+                stack.append((c, True))
+                for child in reversed(children[c]):
+                    stack.append((child, False))
+    return order
+
+
+def junction_tree(G, ordering="mcs"):
+    r"""Returns a junction tree of a given AdjacencyGraph.
+
+    Parameters
+    ----------
+    G : AdjacencyGraph
+        The graph.
+    ordering : string
+        The elimination ordering used to triangulate `G` (see triangulate).
+
+    Returns
+    -------
+    junction_tree : CliqueTree
+        The junction tree of `G`, with the 'sepset', 'resset', 'sub_funcs' and 'id' attributes in each node (clique).
+        The 'sepset' of a clique are the variables it has in common with its parent.
+    cliques : dict
+        The attributes of each clique (the same as junction_tree.nodes).
+    chordal_graph : AdjacencyGraph
+        The triangulation of `G`.
+    alpha : dict
+        The elimination ordering of the nodes of `G`.
+    """
+
+    chordal_graph, alpha, cliques, parents = triangulate_cliques(G, ordering)
+
+    junction_tree = CliqueTree()
+    for c in cliques:
+        junction_tree.add_node(c, sepset=[], resset=[], sub_funcs=[], id=-1)
+
+    for i in range(len(cliques)):
+        if parents[i] >= 0:
+            junction_tree.add_edge(cliques[i], cliques[parents[i]])
+            junction_tree.nodes[cliques[i]]['sepset'] = sorted(set(cliques[i]).intersection(cliques[parents[i]]))
+
+    # the ids are given from the roots to the leaves (reverse post-order)
+    for clique_id, i in enumerate(reversed(range(len(cliques)))):
+        junction_tree.nodes[cliques[i]]['id'] = clique_id
+
+    for c in cliques:
+        sepset = junction_tree.nodes[c]['sepset']
+        junction_tree.nodes[c]['resset'] = [d for d in c if d not in sepset]
+
+    junction_tree.post_order = cliques
+
+    return junction_tree, junction_tree.nodes, chordal_graph, alpha
@@ -0,0 +1,35 @@
+"""
+Tests of the conversion of NKLandscape instances to and from flat arrays, and of their binary files (see instance_cache.py).
+Run with pytest from this directory.
+"""
+
+import random as rnd
+import numpy as np
+import pytest
+from NKLandscape import NKLandscape
+
+
+@pytest.fixture(scope="module")
+def inst():
+    rnd.seed(0)
+    np.random.seed(0)
+    return NKLandscape(20, 3, 20)
+
+def check(copy, inst):
+    assert (copy.n, copy.k, copy.m) == (inst.n, inst.k, inst.m)
+    assert copy.getSubFunctions() == inst.getSubFunctions()
+    for i in range(inst.m):
+        assert np.array_equal(copy.getSFTable(i), inst.getSFTable(i))
+
+    X = np.random.default_rng(0).integers(0, 2, (20, inst.n))
+    assert np.allclose(copy.evaluatePopulation(X), inst.evaluatePopulation(X))
+
+
+def test_arrays_roundtrip(inst):
+    check(NKLandscape.fromArrays(inst.toArrays()), inst)
+
+def test_save_load(inst, tmp_path):
+    inst.save(str(tmp_path / "instance"))
+    copy = NKLandscape.load(str(tmp_path / "instance"))
+    assert isinstance(copy.getSFTable(0), np.memmap)
+    check(copy, inst)